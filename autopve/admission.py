@@ -0,0 +1,108 @@
+from typing import Awaitable, Deque, Optional, Set, Tuple
+import asyncio
+import collections
+import math
+import os
+import time
+from fastapi.responses import PlainTextResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Gate:
+    def __init__(self, name: str, limit: int, queue: int) -> None:
+        self.name: str = name
+        self.limit: int = limit
+        self.queue: int = queue
+        self.active: int = 0
+        self.rejected: int = 0
+        self.hold: float = 0.0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = collections.deque()
+        self._waits: Deque[float] = collections.deque(maxlen=100)
+        self._holders: Set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def oldest(self) -> float:
+        return time.monotonic() - self._waiters[0][0] if self._waiters else 0.0
+
+    @property
+    def wait(self) -> float:
+        return sum(self._waits) / len(self._waits) if self._waits else 0.0
+
+    @property
+    def retry_after(self) -> int:
+        if self.limit <= 0:
+            return 1
+        return max(1, math.ceil(self.hold * (self.depth + 1) / self.limit))
+
+    @property
+    def status(self) -> str:
+        limit = self.limit if self.limit > 0 else "∞"
+        return f"Running {self.active}/{limit} | Queued {self.depth}/{self.queue} (oldest {self.oldest:.1f}s) | Average wait {self.wait:.1f}s | Rejected {self.rejected}"
+
+    async def acquire(self) -> Optional[float]:
+        queued = time.monotonic()
+        if self.limit <= 0 or (self.active < self.limit and not self._waiters):
+            self.active += 1
+            self._waits.append(0.0)
+            return queued
+        if len(self._waiters) >= self.queue:
+            self.rejected += 1
+            logger.warning(f"Rejected {self.name} request, {self.active} running and {self.depth} queued.")
+            return None
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (queued, waiter)
+        self._waiters.append(entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was already handed to this request, pass it on.
+                self._release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            raise
+        started = time.monotonic()
+        self._waits.append(started - queued)
+        return started
+
+    def release(self, started: float) -> None:
+        held = time.monotonic() - started
+        self.hold = held if self.hold == 0.0 else 0.8 * self.hold + 0.2 * held
+        self._release()
+
+    def release_after(self, done: Awaitable, started: float) -> None:
+        async def hold() -> None:
+            try:
+                await done
+            finally:
+                self.release(started)
+
+        task = asyncio.create_task(hold(), name=f"autopve {self.name} slot")
+        self._holders.add(task)
+        task.add_done_callback(self._holders.discard)
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def rejection(self) -> PlainTextResponse:
+        return PlainTextResponse(
+            f"Too many {self.name} requests, retry later.",
+            status_code=503,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+answer = Gate("answer", int(os.environ.get("AUTOPVE_ANSWER_CONCURRENCY", "32")), int(os.environ.get("AUTOPVE_ANSWER_QUEUE", "256")))
+batch = Gate("batch", int(os.environ.get("AUTOPVE_BATCH_CONCURRENCY", "1")), int(os.environ.get("AUTOPVE_BATCH_QUEUE", "4")))
+playbook = Gate("playbook", int(os.environ.get("AUTOPVE_PLAYBOOK_CONCURRENCY", "4")), int(os.environ.get("AUTOPVE_PLAYBOOK_QUEUE", "64")))
@@ -0,0 +1,56 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+from nicegui import app
+import logging
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+
+
+def submit(effect: Callable[[], None], then: Optional[Callable[[], None]] = None) -> None:
+    global _queue, _worker
+    if _queue is None:
+        _queue = asyncio.Queue()
+    if _worker is None or _worker.done():
+        _worker = asyncio.create_task(_drain(), name="autopve background effects")
+    _queue.put_nowait((effect, then))
+
+
+def _run(effects: List[Tuple[Callable[[], None], Optional[Callable[[], None]]]]) -> None:
+    # Follow-ups like grid refreshes only need to run once for every batch of effects that requested them.
+    follow_ups: Dict[Callable[[], None], None] = {}
+    for effect, then in effects:
+        try:
+            effect()
+        except Exception as e:
+            logger.exception(e)
+        if then is not None:
+            follow_ups[then] = None
+    for follow_up in follow_ups:
+        try:
+            follow_up()
+        except Exception as e:
+            logger.exception(e)
+
+
+def _pending() -> List[Tuple[Callable[[], None], Optional[Callable[[], None]]]]:
+    effects = []
+    while _queue is not None and not _queue.empty():
+        effects.append(_queue.get_nowait())
+    return effects
+
+
+async def _drain() -> None:
+    while _queue is not None:
+        effects = [await _queue.get()]
+        effects.extend(_pending())
+        _run(effects)
+
+
+def flush() -> None:
+    _run(_pending())
+
+
+app.on_shutdown(flush)
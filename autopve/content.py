@@ -1,3 +1,4 @@
+from typing import Optional
 import asyncio
 import os
 import shutil
@@ -5,10 +6,13 @@ from nicegui import ui  # type: ignore
 import yaml
 from autopve import elements as el
 from autopve import logo as logo
+from autopve import inheritance, matcher, storage
 from autopve.tabs.settings import Global, Network, NetworkInterfacePinning, Disk, PostInstallWebhook, FirstBootHook
 from autopve.tabs.history import Answer, Playbook
-from autopve.tabs.system import MustContain, MustNotContain, SSHKey
+from autopve.tabs.system import Expression, MustContain, MustMatch, MustNotContain, MustNotMatch, SSHKey
 from autopve.tabs.editor import Editor
+from autopve.tabs.mapping import Mapping
+from autopve.tabs.versions import Versions
 from autopve.interfaces import cli
 import logging
 
@@ -26,6 +30,7 @@ class Content:
         self._grid = None
         self._tab_panel = {}
         self._answer = None
+        self._site = storage.default_site
         self._tasks = []
         self._manage = None
         self._automation = None
@@ -39,7 +44,26 @@ class Content:
     def _build_answer(self):
         with self._header:
             with ui.row().classes("w-full items-center justify-between"):
-                self._answer_display = ui.label(self._answer).classes("text-secondary text-h4")
+                with ui.row().classes("items-center"):
+                    if self._site != storage.default_site:
+                        ui.label(f"{self._site} /").classes("text-secondary text-h4")
+                    self._answer_display = ui.label(self._answer).classes("text-secondary text-h4")
+                    if self._answer != "Default":
+                        extends = el.FSelect(
+                            inheritance.parents(self._answer, self._site),
+                            label="extends",
+                            value=inheritance.declared(self._answer, self._site),
+                            on_change=lambda e: self._extends_changed(e.value),
+                        )
+                        extends.tooltip("Settings not set in this answer are inherited from the selected answer and its ancestors.")
+                        priority = ui.number(
+                            label="priority",
+                            value=matcher.priority(storage.answer(self._answer, site=self._site)),
+                            format="%d",
+                            step=1,
+                            on_change=lambda e: self._priority_changed(e.value),
+                        )
+                        priority.classes("w-[120px]").tooltip("Answers are matched from the highest priority down, equal priorities in creation order.")
                 logo.show()
         with self._content:
             with ui.row().classes("w-full flex-nowrap"):
@@ -57,21 +81,45 @@ class Content:
                         ui.separator()
                         ui.label("STATUS").classes("text-secondary text-h6")
                         self._tab["history"] = ui.tab(name="History").classes("text-secondary justify-self-end")
+                        self._tab["versions"] = ui.tab(name="Versions").classes("text-secondary justify-self-end")
                         self._tab["ssh_key"] = ui.tab(name="SSH Key").classes("text-secondary justify-self-end")
                         if self._answer != "Default":
                             ui.separator()
                             ui.label("FILTERS").classes("text-secondary text-h6")
                             self._tab["must_contain"] = ui.tab(name="Contains").classes("text-secondary justify-self-end")
                             self._tab["must_not_contain"] = ui.tab(name="Doesn't Contain").classes("text-secondary justify-self-end")
+                            self._tab["must_match"] = ui.tab(name="Matches").classes("text-secondary justify-self-end")
+                            self._tab["must_not_match"] = ui.tab(name="Doesn't Match").classes("text-secondary justify-self-end")
+                            self._tab["rule"] = ui.tab(name="Rule").classes("text-secondary justify-self-end")
                 with ui.column().classes("w-full h-full items-center flex-grow"):
                     self._tab_panels = ui.tab_panels(self._tabs, value="Global", on_change=lambda e: self._tab_changed_answer(e), animated=False)
                     self._tab_panels.classes("w-full h-full")
 
+    def _extends_changed(self, parent: str):
+        answer = storage.answer(self._answer, site=self._site)
+        if parent is None or parent == "Default":
+            answer.pop(inheritance.key, None)
+        elif answer.get(inheritance.key) != parent:
+            answer[inheritance.key] = parent
+
+    def _priority_changed(self, value: Optional[float]):
+        answer = storage.answer(self._answer, site=self._site)
+        if value is None or int(value) == 0:
+            answer.pop("priority", None)
+        elif answer.get("priority") != int(value):
+            answer["priority"] = int(value)
+
     async def _tab_changed_answer(self, e):
-        if e.value == "Must Contain":
+        if e.value == "Versions":
+            self._versions.update()
+        elif e.value == "Must Contain":
             self._must_contain.update()
         elif e.value == "Must Not Contain":
             self._must_not_contain.update()
+        elif e.value == "Matches":
+            self._must_match.update()
+        elif e.value == "Doesn't Match":
+            self._must_not_match.update()
 
     async def _build_tab_panels_answer(self):
         self._tab_panels.clear()
@@ -83,32 +131,44 @@ class Content:
             self._firstboot_content = el.ContentTabPanel(self._tab["first_boot"])
             self._post_install_webhook_content = el.ContentTabPanel(self._tab["post_install_webhook"])
             self._history_content = el.ContentTabPanel(self._tab["history"])
+            self._versions_content = el.ContentTabPanel(self._tab["versions"])
             self._ssh_key_content = el.ContentTabPanel(self._tab["ssh_key"])
             if self._answer != "Default":
                 self._must_contain_content = el.ContentTabPanel(self._tab["must_contain"])
                 self._must_not_contain_content = el.ContentTabPanel(self._tab["must_not_contain"])
+                self._must_match_content = el.ContentTabPanel(self._tab["must_match"])
+                self._must_not_match_content = el.ContentTabPanel(self._tab["must_not_match"])
+                self._rule_content = el.ContentTabPanel(self._tab["rule"])
             with self._global_content:
-                Global(answer=self._answer)
+                Global(answer=self._answer, site=self._site)
             with self._network_content:
-                Network(answer=self._answer)
+                Network(answer=self._answer, site=self._site)
             with self._network_interface_pinning_content:
-                NetworkInterfacePinning(answer=self._answer)
+                NetworkInterfacePinning(answer=self._answer, site=self._site)
             with self._disk_content:
-                Disk(answer=self._answer)
+                Disk(answer=self._answer, site=self._site)
             with self._firstboot_content:
-                FirstBootHook(answer=self._answer)
+                FirstBootHook(answer=self._answer, site=self._site)
             with self._post_install_webhook_content:
-                PostInstallWebhook(answer=self._answer)
+                PostInstallWebhook(answer=self._answer, site=self._site)
             with self._history_content:
-                self._history = Answer(answer=self._answer)
+                self._history = Answer(answer=self._answer, site=self._site)
+            with self._versions_content:
+                self._versions = Versions(answer=self._answer, site=self._site, on_rollback=lambda: self.selected("answer", self._answer, self._site))
             with self._ssh_key_content:
                 ssh_key_instance = SSHKey()
                 await ssh_key_instance.build()
             if self._answer != "Default":
                 with self._must_contain_content:
-                    self._must_contain = MustContain(answer=self._answer)
+                    self._must_contain = MustContain(answer=self._answer, site=self._site)
                 with self._must_not_contain_content:
-                    self._must_not_contain = MustNotContain(answer=self._answer)
+                    self._must_not_contain = MustNotContain(answer=self._answer, site=self._site)
+                with self._must_match_content:
+                    self._must_match = MustMatch(answer=self._answer, site=self._site)
+                with self._must_not_match_content:
+                    self._must_not_match = MustNotMatch(answer=self._answer, site=self._site)
+                with self._rule_content:
+                    Expression(answer=self._answer, site=self._site)
 
     def _build_playbook(self):
         with self._header:
@@ -202,9 +262,20 @@ class Content:
             with self._history_content:
                 self._history = Playbook(answer=self._answer)
 
-    async def selected(self, mode, name):
+    def _build_mappings(self):
+        with self._header:
+            with ui.row().classes("w-full items-center justify-between"):
+                ui.label("Mappings").classes("text-secondary text-h4")
+                logo.show()
+        with self._content:
+            with ui.column().classes("w-full h-full items-center") as col:
+                col.style("height: calc(100vh - 100px)")
+                Mapping(answer="")
+
+    async def selected(self, mode, name, site=storage.default_site):
         if mode == "answer":
             self._answer = name
+            self._site = site
             self._playbook = None
             self.hide()
             self._header.clear()
@@ -221,6 +292,14 @@ class Content:
             self._build_playbook()
             self._build_tab_panels_playbook()
             self._header.visible = True
+        elif mode == "mappings":
+            self._answer = None
+            self._playbook = None
+            self.hide()
+            self._header.clear()
+            self._content.clear()
+            self._build_mappings()
+            self._header.visible = True
         elif mode == "files":
             pass
         else:
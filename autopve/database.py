@@ -0,0 +1,228 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+import contextlib
+import json
+import os
+import sqlite3
+import time
+from autopve import delta
+import logging
+
+logger = logging.getLogger(__name__)
+
+schema = """
+CREATE TABLE IF NOT EXISTS answers (
+    site TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (site, name)
+);
+CREATE INDEX IF NOT EXISTS answers_position ON answers (site, position);
+CREATE TABLE IF NOT EXISTS revisions (
+    site TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT,
+    PRIMARY KEY (site, name, version)
+);
+"""
+# Every version is stored as the changes to the one before it, with the whole answer every so often so loading one stays quick.
+keyframe_interval = 50
+
+
+@dataclass(kw_only=True)
+class Revision:
+    site: str
+    name: str
+    version: int
+    created: float
+    kind: str
+    size: int
+
+
+_connection: Optional[sqlite3.Connection] = None
+# The last row written for every answer, so a change to a whole site only writes the answers that differ.
+_rows: Dict[Tuple[str, str], str] = {}
+_positions: Dict[Tuple[str, str], int] = {}
+_versions: Dict[Tuple[str, str], int] = {}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _connection = sqlite3.connect(path, isolation_level=None)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.executescript(schema)
+        logger.info(f"Opened answer database '{path}'.")
+    return _connection
+
+
+def close() -> None:
+    global _connection
+    if _connection is not None:
+        _connection.close()
+        _connection = None
+
+
+def _require() -> sqlite3.Connection:
+    if _connection is None:
+        raise RuntimeError("The answer database is not open.")
+    return _connection
+
+
+def empty() -> bool:
+    return _require().execute("SELECT 1 FROM answers LIMIT 1").fetchone() is None
+
+
+@contextlib.contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    connection = _require()
+    connection.execute("BEGIN")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        # The remembered rows may no longer match the database, read them back.
+        _reload(connection)
+        raise
+    connection.execute("COMMIT")
+
+
+def _reload(connection: sqlite3.Connection) -> None:
+    _rows.clear()
+    _positions.clear()
+    _versions.clear()
+    for site, name, position, data in connection.execute("SELECT site, name, position, data FROM answers"):
+        _rows[(site, name)] = data
+        _positions[(site, name)] = position
+    for site, name, version in connection.execute("SELECT site, name, MAX(version) FROM revisions GROUP BY site, name"):
+        _versions[(site, name)] = version
+
+
+def load() -> Dict[str, Dict[str, Any]]:
+    with _transaction() as connection:
+        # Answers saved before versions were kept start with their current content as the first version.
+        connection.execute(
+            "INSERT INTO revisions (site, name, version, created, kind, data) SELECT site, name, 1, ?, 'full', data FROM answers a WHERE NOT EXISTS (SELECT 1 FROM revisions r WHERE r.site = a.site AND r.name = a.name)",
+            (time.time(),),
+        )
+    _reload(_require())
+    sites: Dict[str, Dict[str, Any]] = {}
+    for site, name, data in _require().execute("SELECT site, name, data FROM answers ORDER BY site, position"):
+        sites.setdefault(site, {})[name] = json.loads(data)
+    return sites
+
+
+def row(site: str, name: str) -> Optional[str]:
+    return _rows.get((site, name))
+
+
+def version(site: str, name: str) -> int:
+    return _versions.get((site, name), 0)
+
+
+def save(site: str, name: str, data: Any) -> None:
+    with _transaction() as connection:
+        _write(connection, site, name, data, _position(connection, site, name))
+
+
+def sync(site: str, answers: Dict[str, Any]) -> int:
+    # Brings every row of a site in line with its answers in one transaction, unchanged answers are not written.
+    written = 0
+    with _transaction() as connection:
+        for position, (name, data) in enumerate(answers.items()):
+            if _write(connection, site, name, data, position):
+                written += 1
+        for stale_site, name in [key for key in _rows if key[0] == site and key[1] not in answers]:
+            connection.execute("DELETE FROM answers WHERE site = ? AND name = ?", (stale_site, name))
+            _record(connection, stale_site, name, _rows[(stale_site, name)], None)
+            del _rows[(stale_site, name)]
+            _positions.pop((stale_site, name), None)
+            written += 1
+    return written
+
+
+def migrate(sites: Dict[str, Dict[str, Any]]) -> int:
+    count = 0
+    with _transaction() as connection:
+        for site, answers in sites.items():
+            for position, (name, data) in enumerate(answers.items()):
+                _write(connection, site, name, data, position)
+                count += 1
+    return count
+
+
+def _position(connection: sqlite3.Connection, site: str, name: str) -> int:
+    position = _positions.get((site, name))
+    if position is None:
+        row = connection.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM answers WHERE site = ?", (site,)).fetchone()
+        position = row[0]
+    return position
+
+
+def _write(connection: sqlite3.Connection, site: str, name: str, data: Any, position: int) -> bool:
+    text = json.dumps(data)
+    if _rows.get((site, name)) == text and _positions.get((site, name)) == position:
+        return False
+    connection.execute(
+        "INSERT INTO answers (site, name, position, data) VALUES (?, ?, ?, ?) ON CONFLICT (site, name) DO UPDATE SET position = excluded.position, data = excluded.data",
+        (site, name, position, text),
+    )
+    if _rows.get((site, name)) != text:
+        _record(connection, site, name, _rows.get((site, name)), text)
+    _rows[(site, name)] = text
+    _positions[(site, name)] = position
+    return True
+
+
+def _record(connection: sqlite3.Connection, site: str, name: str, previous: Optional[str], text: Optional[str]) -> None:
+    version = _versions.get((site, name), 0) + 1
+    kind, data = "full", text
+    if text is None:
+        kind = "deleted"
+    elif previous is not None and version % keyframe_interval != 1:
+        changes = json.dumps(delta.diff(json.loads(previous), json.loads(text)))
+        if len(changes) < len(text):
+            kind, data = "delta", changes
+    connection.execute("INSERT INTO revisions (site, name, version, created, kind, data) VALUES (?, ?, ?, ?, ?, ?)", (site, name, version, time.time(), kind, data))
+    _versions[(site, name)] = version
+
+
+def revisions(site: str, name: str) -> List[Revision]:
+    return [
+        Revision(site=site, name=name, version=version, created=created, kind=kind, size=size)
+        for version, created, kind, size in _require().execute(
+            "SELECT version, created, kind, COALESCE(LENGTH(data), 0) FROM revisions WHERE site = ? AND name = ? ORDER BY version DESC", (site, name)
+        )
+    ]
+
+
+def revision(site: str, name: str, version: int) -> Optional[Dict[str, Any]]:
+    # Starts at the last whole answer at or before the version and applies the changes recorded after it.
+    if version < 1 or version > _versions.get((site, name), 0):
+        return None
+    rows = (
+        _require()
+        .execute(
+            "SELECT kind, data FROM revisions WHERE site = ? AND name = ? AND version <= ? AND version >= "
+            "(SELECT COALESCE(MAX(version), 0) FROM revisions WHERE site = ? AND name = ? AND version <= ? AND kind != 'delta') ORDER BY version",
+            (site, name, version, site, name, version),
+        )
+        .fetchall()
+    )
+    if len(rows) == 0 or rows[0][0] == "delta":
+        return None
+    data = None
+    for kind, text in rows:
+        if kind == "full":
+            data = json.loads(text)
+        elif kind == "delta":
+            data = delta.apply(data, json.loads(text))
+        else:
+            data = None
+    return data
@@ -0,0 +1,47 @@
+from typing import Any, List, Optional
+import difflib
+import json
+
+
+def diff(old: Any, new: Any) -> List[List[Any]]:
+    # A change is [path, value] to set a value or [path] to remove it, nested settings only record what changed.
+    changes: List[List[Any]] = []
+    _diff(old, new, [], changes)
+    return changes
+
+
+def _diff(old: Any, new: Any, path: List[Any], changes: List[List[Any]]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                changes.append([path + [key]])
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, path + [key], changes)
+            else:
+                changes.append([path + [key], value])
+    elif type(old) is not type(new) or old != new:
+        changes.append([path, new])
+
+
+def apply(data: Any, changes: List[List[Any]]) -> Any:
+    # Changes are applied in place, the changed data is returned because a change to the root replaces it.
+    for change in changes:
+        path = change[0]
+        if len(path) == 0:
+            data = change[1] if len(change) > 1 else None
+            continue
+        parent = data
+        for key in path[:-1]:
+            parent = parent[key]
+        if len(change) > 1:
+            parent[path[-1]] = change[1]
+        else:
+            parent.pop(path[-1], None)
+    return data
+
+
+def lines(old: Optional[Any], new: Optional[Any], old_label: str = "before", new_label: str = "after") -> str:
+    before = json.dumps(old, indent=2).splitlines() if old is not None else []
+    after = json.dumps(new, indent=2).splitlines() if new is not None else []
+    return "\n".join(difflib.unified_diff(before, after, fromfile=old_label, tofile=new_label, lineterm=""))
@@ -3,7 +3,7 @@ import copy
 from nicegui.events import KeyEventArguments, UploadEventArguments
 from nicegui import ui  # type: ignore
 from autopve import elements as el
-from autopve import storage
+from autopve import filestore, inheritance, mappings, storage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +15,8 @@ class Drawer(object):
         self._hide_content = hide_content
         self._header_row = None
         self._answers_table = None
+        self._site = storage.default_site
+        self._site_select = None
         self._name = ""
         self._answername = ""
         self._username = ""
@@ -39,6 +41,13 @@ class Drawer(object):
 
         with ui.left_drawer(top_corner=True).props("width=226 behavior=desktop bordered").classes("q-pa-none") as drawer:
             with ui.column().classes("h-full w-full q-py-xs q-px-md") as content:
+                with ui.column():
+                    ui.label(text="SITE").classes("text-secondary")
+                    with ui.row():
+                        el.IButton(icon="add", on_click=self._display_site_dialog)
+                        el.IButton(icon="remove", on_click=self._remove_site)
+                self._site_select = ui.select(storage.sites(), value=self._site, on_change=lambda e: self._site_changed(e.value)).classes("w-full")
+                ui.separator()
                 with ui.column():
                     ui.label(text="ANSWERS").classes("text-secondary")
                     with ui.row():
@@ -69,9 +78,13 @@ class Drawer(object):
                 )
                 self._answers_table.classes("w-full")
                 self._answers_table.visible = False
-                for name in storage.answers.keys():
+                for name in storage.answer_set(self._site).keys():
                     self._add_answer_to_table(name)
                 ui.separator()
+                with ui.row().classes("items-center"):
+                    ui.label(text="MAPPINGS").classes("text-secondary")
+                    el.IButton(icon="table_view", on_click=self._clicked_mappings)
+                ui.separator()
                 with ui.column():
                     ui.label(text="PLAYBOOKS").classes("text-secondary")
                     with ui.row():
@@ -110,13 +123,26 @@ class Drawer(object):
                     with ui.row():
 
                         async def handle_upload(e: UploadEventArguments):
-                            storage.mk_file(e.name, e.content)
-                            self._add_file_to_table(e.name)
+                            try:
+                                entry = await storage.receive_file(e.file.name, e.file.iterate(chunk_size=filestore.chunk_size), e.file.size())
+                            except filestore.QuotaExceeded as error:
+                                el.Notification(str(error), type="negative", timeout=10)
+                                return
+                            finally:
+                                upload.reset()
+                            if entry is None:
+                                el.Notification(f"File '{e.file.name}' already exists, remove it first to replace it.", type="warning", timeout=5)
+                            self._add_file_to_table(e.file.name)
 
                         async def start_upload(upload: ui.upload):
                             upload.run_method("pickFiles")
 
-                        upload = ui.upload(on_upload=handle_upload, auto_upload=True)
+                        upload = ui.upload(
+                            on_upload=handle_upload,
+                            on_rejected=lambda: el.Notification(f"Files larger than {filestore.max_file_size} bytes are not accepted.", type="negative", timeout=10),
+                            max_file_size=filestore.max_file_size if filestore.max_file_size > 0 else None,
+                            auto_upload=True,
+                        )
                         upload.classes("hidden")
                         el.IButton(icon="add", on_click=lambda _: start_upload(upload))
                         self._buttons_files["remove"] = el.IButton(icon="remove", on_click=lambda: self._modify_file("remove"))
@@ -150,6 +176,62 @@ class Drawer(object):
             chevron.classes("border-[#E97451]")
             chevron.props(f"color=primary text-color=accent")
 
+    def _site_changed(self, site):
+        if site is None or site == self._site:
+            return
+        self._hide_content()
+        self._modify_answer(None)
+        self._site = site
+        self._answers_table.rows.clear()
+        self._answers_table.update()
+        for name in storage.answer_set(site).keys():
+            self._add_answer_to_table(name)
+
+    async def _display_site_dialog(self):
+        with ui.dialog() as site_dialog, el.Card():
+            with el.DBody(height="fit", width="[320px]"):
+                with el.WColumn():
+                    all_sites = storage.sites()
+
+                    def site_check(value: str) -> Optional[bool]:
+                        if len(value.strip()) == 0 or value.strip() in all_sites:
+                            return False
+                        return None
+
+                    def enter_submit(e: KeyEventArguments) -> None:
+                        if e.key == "Enter" and save_ea.no_errors is True:
+                            site_dialog.submit("save")
+                        elif e.key == "Escape":
+                            site_dialog.close()
+
+                    site_input = el.VInput(label="site", value=" ", invalid_characters="""'`"$\\;&<>|(){}/?#% """, invalid_values=all_sites, check=site_check, max_length=20)
+                save_ea = el.ErrorAggregator(site_input)
+                el.DButton("SAVE", on_click=lambda: site_dialog.submit("save")).bind_enabled_from(save_ea, "no_errors")
+                ui.keyboard(on_key=enter_submit, ignore=[])
+                site_input.value = ""
+
+        result = await site_dialog
+        site = site_input.value.strip()
+        if result == "save" and len(site) > 0 and site not in storage.sites():
+            storage.add_site(site)
+            self._site_select.set_options(storage.sites(), value=site)
+
+    async def _remove_site(self):
+        if self._site == storage.default_site:
+            el.Notification(f"The '{storage.default_site}' site can not be removed.", type="warning", timeout=5)
+            return
+        with ui.dialog() as confirm_dialog, el.Card():
+            with el.DBody(height="fit", width="[320px]"):
+                with el.WColumn():
+                    ui.label(f"Remove site '{self._site}' and all of its answers?").classes("text-secondary")
+                el.DButton("REMOVE", on_click=lambda: confirm_dialog.submit("remove"))
+        if await confirm_dialog == "remove":
+            site = self._site
+            for name in list(storage.answer_set(site).keys()):
+                mappings.remove_answer(name, site)
+            storage.remove_site(site)
+            self._site_select.set_options(storage.sites(), value=storage.default_site)
+
     def _add_answer_to_table(self, name):
         if len(name) > 0:
             for row in self._answers_table.rows:
@@ -180,8 +262,9 @@ class Drawer(object):
         with ui.dialog() as answer_dialog, el.Card():
             with el.DBody(height="fit", width="[320px]"):
                 with el.WColumn():
-                    all_answers = list(storage.answers.keys())
-                    for answer in list(storage.answers.keys()):
+                    answers = storage.answer_set(self._site)
+                    all_answers = list(answers.keys())
+                    for answer in list(answers.keys()):
                         all_answers.append(answer.replace(" ", ""))
                     if name != "":
                         if name in all_answers:
@@ -213,15 +296,17 @@ class Drawer(object):
         result = await answer_dialog
         answer = answer_input.value.strip()
         if result == "save" and name != answer:
-            if name in storage.answers:
-                storage.answers[answer] = storage.answer(name, copy=True)
+            if name in answers:
+                answers[answer] = storage.answer(name, copy=True, site=self._site)
                 if cp is False:
-                    del storage.answers[name]
+                    del answers[name]
+                    mappings.rename_answer(name, answer, self._site)
+                    inheritance.rename_answer(name, answer, self._site)
                     for row in self._answers_table.rows:
                         if name == row["name"]:
                             self._answers_table.remove_row(row)
             else:
-                storage.answer(answer)
+                storage.answer(answer, site=self._site)
             self._add_answer_to_table(answer)
 
     async def _display_playbook_dialog(self, name="", cp=False):
@@ -348,8 +433,11 @@ class Drawer(object):
                 await self._display_answer_dialog(name=answer)
                 self._modify_answer(None)
             elif self._selection_mode == "remove":
-                if answer in storage.answers:
-                    del storage.answers[answer]
+                answers = storage.answer_set(self._site)
+                if answer in answers:
+                    del answers[answer]
+                    mappings.remove_answer(answer, self._site)
+                    inheritance.remove_answer(answer, self._site)
                 self._answers_table.remove_row(e.selection[0])
 
     async def _selected_playbook(self, e):
@@ -388,7 +476,11 @@ class Drawer(object):
         if "name" in e.args[1]:
             answer = e.args[1]["name"]
             if self._on_click is not None:
-                await self._on_click("answer", answer)
+                await self._on_click("answer", answer, self._site)
+
+    async def _clicked_mappings(self):
+        if self._on_click is not None:
+            await self._on_click("mappings", "Mappings")
 
     async def _clicked_playbook(self, e):
         if "name" in e.args[1]:
@@ -0,0 +1,248 @@
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional
+from dataclasses import asdict, dataclass
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from nicegui import app
+from autopve import writer
+import logging
+
+logger = logging.getLogger(__name__)
+
+root = "data/files"
+max_file_size = int(os.environ.get("AUTOPVE_FILE_MAX_SIZE", str(16 * 1024**3)))
+quota = int(os.environ.get("AUTOPVE_FILES_QUOTA", "0"))
+chunk_size = 1024 * 1024
+
+
+class QuotaExceeded(ValueError):
+    pass
+
+
+@dataclass(kw_only=True)
+class Entry:
+    name: str
+    digest: str
+    size: int
+    created: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+class Store:
+    # Files are kept once per content under .objects/ by their sha256, names only point at a digest.
+    def __init__(self, root: str) -> None:
+        self.root: str = root
+        self.objects: str = os.path.join(root, ".objects")
+        self.index_path: str = os.path.join(root, ".index.json")
+        self._entries: Dict[str, Entry] = {}
+        self._adopting: Dict[str, "asyncio.Task[Optional[Entry]]"] = {}
+
+    def load(self) -> None:
+        os.makedirs(self.objects, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self._entries = {name: Entry(**entry) for name, entry in json.load(f).items()}
+        missing = [name for name, entry in self._entries.items() if not os.path.exists(self.path(entry.digest))]
+        for name in missing:
+            logger.warning(f"File '{name}' is missing its content, it is removed.")
+            del self._entries[name]
+        if missing:
+            self._save()
+        logger.info(f"Serving {len(self._entries)} files from {len(set(entry.digest for entry in self._entries.values()))} stored objects.")
+
+    async def adopt(self) -> int:
+        # Files placed directly in the directory, by earlier versions or through a bind mount, are moved into the store.
+        count = 0
+        for name in await asyncio.to_thread(self._loose):
+            if await self._adopt_file(name) is not None:
+                count += 1
+        if count > 0:
+            logger.info(f"Adopted {count} files placed in '{self.root}'.")
+        return count
+
+    def _loose(self) -> List[str]:
+        names = []
+        for directory, folders, files in os.walk(self.root):
+            folders[:] = [folder for folder in folders if not folder.startswith(".")]
+            names.extend(os.path.relpath(os.path.join(directory, file), self.root).replace(os.sep, "/") for file in files if not file.startswith("."))
+        return names
+
+    def _placed(self, name: str) -> Optional[str]:
+        path = os.path.normpath(os.path.join(self.root, name))
+        if not path.startswith(os.path.normpath(self.root) + os.sep) or any(part.startswith(".") for part in name.split("/")) or not os.path.isfile(path):
+            return None
+        return path
+
+    async def _adopt_file(self, name: str) -> Optional[Entry]:
+        # Nodes asking for the same new file at once wait for one adoption instead of each hashing it again.
+        task = self._adopting.get(name)
+        if task is None:
+            task = asyncio.create_task(self._adopt_placed(name), name=f"autopve adopt {name}")
+            self._adopting[name] = task
+            task.add_done_callback(lambda _: self._adopting.pop(name, None))
+        return await asyncio.shield(task)
+
+    async def _adopt_placed(self, name: str) -> Optional[Entry]:
+        path = self._placed(name)
+        if path is None:
+            return None
+        try:
+            entry = await asyncio.to_thread(self._hash_placed, name, path)
+            if entry is None:
+                return None
+            # Files already on disk are taken in whatever their size, the limits are for new uploads.
+            self._commit(entry, path)
+            if os.path.exists(path):
+                os.remove(path)
+        except FileNotFoundError:
+            # Adopted by a request that asked for it at the same time.
+            return None
+        except OSError as e:
+            logger.warning(f"File '{name}' could not be adopted: {e}")
+            return None
+        self._save()
+        logger.info(f"Adopted file '{name}' with {entry.size} bytes.")
+        return entry
+
+    def _hash_placed(self, name: str, path: str) -> Optional[Entry]:
+        # The file is hashed where it is and then moved into the store, a file still being written is left for the next request.
+        before = os.stat(path)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        after = os.stat(path)
+        if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+            logger.info(f"File '{name}' changed while it was hashed, it is adopted later.")
+            return None
+        return Entry(name=name, digest=digest.hexdigest(), size=after.st_size, created=time.time())
+
+    def _save(self) -> None:
+        writer.atomic_write(self.index_path, json.dumps({name: asdict(entry) for name, entry in self._entries.items()}, indent=2))
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    async def get(self, name: str) -> Optional[Entry]:
+        entry = self._entries.get(name)
+        if self._placed(name) is not None:
+            # A file copied into the directory while running, new or over a stored one, is adopted the first time it is asked for.
+            entry = await self._adopt_file(name) or self._entries.get(name)
+        return entry
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def used(self) -> int:
+        return sum({entry.digest: entry.size for entry in self._entries.values()}.values())
+
+    def _limit(self, name: str) -> int:
+        # The most a new file may take, 0 for no limit.
+        limits = [max_file_size] if max_file_size > 0 else []
+        if quota > 0:
+            available = quota - self.used()
+            if available <= 0:
+                raise QuotaExceeded(f"File '{name}' is not stored, the {quota} byte quota for files is used up.")
+            limits.append(available)
+        return min(limits) if limits else 0
+
+    @staticmethod
+    def _absorb(f: BinaryIO, digest: "hashlib._Hash", chunk: bytes) -> None:
+        digest.update(chunk)
+        f.write(chunk)
+
+    def _temporary(self) -> str:
+        os.makedirs(self.objects, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.objects, suffix=".tmp")
+        os.close(descriptor)
+        return temporary
+
+    def put(self, name: str, data: BinaryIO, replace: bool = False) -> Optional[Entry]:
+        if name in self._entries and replace is False:
+            return None
+        limit = self._limit(name)
+        digest = hashlib.sha256()
+        size = 0
+        temporary = self._temporary()
+        try:
+            with open(temporary, "wb") as f:
+                for chunk in iter(lambda: data.read(chunk_size), b""):
+                    size += len(chunk)
+                    if limit > 0 and size > limit:
+                        raise QuotaExceeded(f"File '{name}' is not stored, it is larger than the {limit} bytes allowed.")
+                    self._absorb(f, digest, chunk)
+            entry = Entry(name=name, digest=digest.hexdigest(), size=size, created=time.time())
+            self._commit(entry, temporary)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self._save()
+        return entry
+
+    async def receive(self, name: str, chunks: AsyncIterator[bytes], size: Optional[int] = None) -> Optional[Entry]:
+        # Uploads are written and hashed chunk by chunk off the event loop, memory use does not grow with the file.
+        if name in self._entries:
+            return None
+        limit = self._limit(name)
+        if limit > 0 and size is not None and size > limit:
+            raise QuotaExceeded(f"File '{name}' is not stored, it is larger than the {limit} bytes allowed.")
+        digest = hashlib.sha256()
+        received = 0
+        temporary = self._temporary()
+        try:
+            with open(temporary, "wb") as f:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if limit > 0 and received > limit:
+                        raise QuotaExceeded(f"File '{name}' is not stored, it is larger than the {limit} bytes allowed.")
+                    await asyncio.to_thread(self._absorb, f, digest, chunk)
+                f.flush()
+                await asyncio.to_thread(os.fsync, f.fileno())
+            entry = Entry(name=name, digest=digest.hexdigest(), size=received, created=time.time())
+            self._commit(entry, temporary)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self._save()
+        logger.info(f"Stored file '{name}' with {received} bytes.")
+        return entry
+
+    def _commit(self, entry: Entry, temporary: str) -> None:
+        path = self.path(entry.digest)
+        if os.path.exists(path):
+            logger.info(f"File '{entry.name}' has the same content as a stored file, it is kept once.")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        previous = self._entries.get(entry.name)
+        self._entries[entry.name] = entry
+        if previous is not None:
+            self._collect(previous.digest)
+
+    def remove(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._collect(entry.digest)
+            self._save()
+
+    def _collect(self, digest: str) -> None:
+        if all(entry.digest != digest for entry in self._entries.values()):
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+store = Store(root)
+store.load()
+
+app.on_startup(store.adopt)
@@ -0,0 +1,68 @@
+from typing import Any, Dict, Optional
+from dataclasses import dataclass
+import collections
+import hashlib
+import os
+import time
+from autopve import storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+window = float(os.environ.get("AUTOPVE_IDEMPOTENCY_WINDOW", "300"))
+max_entries = 10000
+
+
+@dataclass(kw_only=True)
+class Entry:
+    site: str
+    body: bytes
+    # Only what a repeat needs to find the history row of the request it repeats, not the request and its system information.
+    answer: str
+    versions: Dict[str, int]
+    name: str
+    timestamp: float
+    expires: float
+
+
+_entries: "collections.OrderedDict[str, Entry]" = collections.OrderedDict()
+
+
+def key(document: bytes, site: str = storage.default_site) -> str:
+    digest = hashlib.sha256(document)
+    digest.update(site.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def lookup(digest: str) -> Optional[Entry]:
+    if window <= 0:
+        return None
+    now = time.monotonic()
+    # Entries are kept in the order they expire, so expired ones are always at the front.
+    while _entries and next(iter(_entries.values())).expires <= now:
+        _entries.popitem(last=False)
+    return _entries.get(digest)
+
+
+def store(digest: str, body: bytes, request: Any, site: str = storage.default_site) -> None:
+    if window <= 0:
+        return
+    _entries.pop(digest, None)
+    _entries[digest] = Entry(
+        site=site, body=body, answer=request.answer, versions=request.versions, name=request.name, timestamp=request.timestamp, expires=time.monotonic() + window
+    )
+    while len(_entries) > max_entries:
+        _entries.popitem(last=False)
+
+
+def clear(site: Optional[str] = None, name: Optional[str] = None) -> None:
+    stale = [digest for digest, entry in _entries.items() if site is None or entry.site == site]
+    if stale:
+        logger.debug(f"Dropped {len(stale)} repeated request responses after a change.")
+    for digest in stale:
+        del _entries[digest]
+
+
+# A repeat is only served from here while the answers of its site and the mappings it was resolved with are unchanged.
+storage.on_answer_change(clear)
+storage.mappings.on_change(lambda _: clear())
@@ -0,0 +1,90 @@
+from typing import Dict, List, Optional, Set
+from autopve import storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+key = "extends"
+
+_parents: Dict[str, Dict[str, str]] = {}
+_children: Dict[str, Dict[str, Set[str]]] = {}
+
+
+def declared(name: str, site: str = storage.default_site) -> str:
+    answers = storage.answer_set(site)
+    parent = answers.get(name, {}).get(key, "Default")
+    if not isinstance(parent, str) or parent == name or parent not in answers:
+        return "Default"
+    return parent
+
+
+def _link(site: str, name: str) -> None:
+    parents = _parents.setdefault(site, {})
+    children = _children.setdefault(site, {})
+    previous = parents.pop(name, None)
+    if previous is not None:
+        children.get(previous, set()).discard(name)
+    if name != "Default" and name in storage.answer_set(site):
+        parent = declared(name, site)
+        parents[name] = parent
+        children.setdefault(parent, set()).add(name)
+
+
+def _rebuild(site: str) -> None:
+    _parents.pop(site, None)
+    _children.pop(site, None)
+    for name in storage.answer_set(site).keys():
+        _link(site, name)
+
+
+def _changed(site: str, name: Optional[str]) -> None:
+    if name is None:
+        _rebuild(site)
+    else:
+        _link(site, name)
+
+
+storage.on_answer_change(_changed)
+for site in storage.sites():
+    _rebuild(site)
+
+
+def chain(name: str, site: str = storage.default_site) -> List[str]:
+    parents = _parents.get(site, {})
+    lineage = [name]
+    while lineage[-1] != "Default":
+        parent = parents.get(lineage[-1], "Default")
+        if parent in lineage:
+            logger.warning(f"Answer '{name}' has an inheritance cycle through '{parent}', falling back to 'Default'.")
+            parent = "Default"
+        lineage.append(parent)
+    return lineage[::-1]
+
+
+def descendants(name: str, site: str = storage.default_site) -> Set[str]:
+    children = _children.get(site, {})
+    found: Set[str] = set()
+    pending = [name]
+    while pending:
+        for child in children.get(pending.pop(), set()):
+            if child not in found:
+                found.add(child)
+                pending.append(child)
+    return found
+
+
+def parents(name: str, site: str = storage.default_site) -> List[str]:
+    excluded = descendants(name, site) | {name}
+    return [answer for answer in storage.answer_set(site).keys() if answer not in excluded]
+
+
+def rename_answer(name: str, new_name: str, site: str = storage.default_site) -> None:
+    for data in storage.answer_set(site).values():
+        if data.get(key) == name:
+            data[key] = new_name
+
+
+def remove_answer(name: str, site: str = storage.default_site) -> None:
+    for data in storage.answer_set(site).values():
+        if data.get(key) == name:
+            del data[key]
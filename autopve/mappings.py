@@ -0,0 +1,95 @@
+from typing import Any, Collection, Dict, List, Optional, Tuple, Union
+import csv
+import io
+import re
+from autopve import storage, sysinfo
+import logging
+
+logger = logging.getLogger(__name__)
+
+identifier_paths = [sysinfo.parse_path(path) for path in ["dmi.system.serial", "dmi.baseboard.serial", "dmi.chassis.serial", "network_interfaces[*].mac"]]
+mac_pattern = re.compile(r"[0-9a-f]{12}")
+header_names = ["identifier", "mac", "serial"]
+
+
+def normalize(identifier: str) -> str:
+    identifier = identifier.strip()
+    digits = re.sub(r"[:\-.\s]", "", identifier).lower()
+    if mac_pattern.fullmatch(digits):
+        return ":".join(digits[i : i + 2] for i in range(0, 12, 2))
+    return identifier.upper()
+
+
+def identifiers(system_info: Union[Dict[str, Any], sysinfo.Normalized]) -> List[str]:
+    normalized = sysinfo.normalize(system_info)
+    found = []
+    for segments in identifier_paths:
+        for value in normalized.values(segments):
+            if isinstance(value, str) and len(value.strip()) > 0:
+                found.append(normalize(value))
+    return found
+
+
+def lookup(system_info: Union[Dict[str, Any], sysinfo.Normalized], table: Optional[Dict[str, str]] = None, answers: Optional[Collection[str]] = None) -> Optional[str]:
+    table = storage.mappings if table is None else table
+    answers = storage.snapshot().names if answers is None else answers
+    if len(table) == 0:
+        return None
+    for identifier in identifiers(system_info):
+        answer = table.get(identifier)
+        if answer is not None and answer in answers:
+            return answer
+    return None
+
+
+def import_csv(text: str) -> Tuple[int, List[str]]:
+    imported: Dict[str, str] = {}
+    skipped: List[str] = []
+    known = set(storage.answer_names())
+    for row in csv.reader(io.StringIO(text)):
+        if len(row) == 0 or all(len(cell.strip()) == 0 for cell in row):
+            continue
+        if len(row) < 2:
+            skipped.append(",".join(row))
+            continue
+        identifier, answer = row[0].strip(), row[1].strip()
+        if identifier.lower() in header_names:
+            continue
+        if len(identifier) == 0 or answer not in known:
+            skipped.append(",".join(row))
+            continue
+        imported[normalize(identifier)] = answer
+    storage.mappings.update(imported)
+    logger.info(f"Imported {len(imported)} mappings, skipped {len(skipped)} rows.")
+    return len(imported), skipped
+
+
+def export_csv() -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["identifier", "answer"])
+    for identifier, answer in sorted(storage.mappings.items()):
+        writer.writerow([identifier, answer])
+    return output.getvalue()
+
+
+def _shared(name: str, site: str) -> bool:
+    # Mappings refer to answers by name, another site still using the name keeps its mappings.
+    return any(name in storage.answer_set(other) for other in storage.sites() if other != site)
+
+
+def rename_answer(name: str, new_name: str, site: str = storage.default_site) -> None:
+    if _shared(name, site):
+        return
+    renamed = {identifier: new_name for identifier, answer in storage.mappings.items() if answer == name}
+    if len(renamed) > 0:
+        storage.mappings.update(renamed)
+
+
+def remove_answer(name: str, site: str = storage.default_site) -> None:
+    if _shared(name, site):
+        return
+    remaining = {identifier: answer for identifier, answer in storage.mappings.items() if answer != name}
+    if len(remaining) != len(storage.mappings):
+        storage.mappings.clear()
+        storage.mappings.update(remaining)
@@ -0,0 +1,300 @@
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Union
+from dataclasses import dataclass
+import json
+import re
+import threading
+import time
+from autopve import patterns, rules, storage, sysinfo
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Both strategies are linear in the payload size, below this many distinct filters the C substring search beats walking the automaton in Python.
+scan_threshold = 256
+
+
+class Automaton:
+    def __init__(self, patterns: List[str]) -> None:
+        self.patterns: List[str] = patterns
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(patterns):
+            self._insert(index, pattern)
+        self._link()
+
+    def _insert(self, index: int, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + (index,)
+
+    def _link(self) -> None:
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] = self._output[next_state] + self._output[fail]
+
+    def search(self, text: str) -> Set[int]:
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+rule_pattern = re.compile(r"^\s*(\S+?)\s*==\s*(.*?)\s*$")
+
+
+@dataclass(frozen=True)
+class Rule:
+    path: str
+    segments: Tuple[Union[str, int], ...]
+    value: str
+
+
+def parse_rule(entry: str) -> Optional[Rule]:
+    match = rule_pattern.match(entry)
+    if match is None:
+        return None
+    path, value = match.groups()
+    segments = sysinfo.parse_path(path)
+    if segments is None:
+        return None
+    if len(value) > 1 and value[0] == '"' and value[-1] == '"':
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+    return Rule(path=path, segments=segments, value=value)
+
+
+def priority(data: Mapping[str, Any]) -> int:
+    try:
+        return int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(kw_only=True)
+class Candidate:
+    answer: str
+    priority: int
+    must_contain: Tuple[int, ...]
+    must_not_contain: Tuple[int, ...]
+    rule: Optional[int] = None
+    regexes: Tuple[int, ...] = ()
+
+
+class Evaluation:
+    def __init__(self, matcher: "Matcher", system_info: sysinfo.Normalized, explain: Optional[Dict[str, Any]] = None) -> None:
+        self.matcher: Matcher = matcher
+        self.system_info: sysinfo.Normalized = system_info
+        self.system_info_raw: str = system_info.raw
+        self.explain: Optional[Dict[str, Any]] = explain
+        self._fired: Dict[int, bool] = {}
+        self._nodes: Dict[int, bool] = {}
+        # Substring filters and field rules are all settled up front, only regex filters are searched when a candidate needs them.
+        self.found: Set[int] = matcher.scan(system_info)
+
+    def fired(self, index: int) -> bool:
+        fired = self._fired.get(index)
+        if fired is None:
+            regex = self.matcher._regex_filters.get(index)
+            fired = regex.search(self.system_info) if regex is not None else index in self.found
+            self._fired[index] = fired
+        return fired
+
+    def holds(self, rule: int) -> bool:
+        return self.matcher.program.evaluate(rule, self.system_info_raw, self.system_info.values, self._nodes)
+
+    def disabled(self, candidate: Candidate) -> List[str]:
+        # A regex filter switched off for overrunning its budget can neither let an answer in nor keep one out, so the answer is not matched at all.
+        return [self.matcher.filters[i] for i in candidate.regexes if self.matcher._regex_filters[i].disabled]
+
+    def accepts(self, candidate: Candidate) -> bool:
+        if self.explain is not None:
+            return self._traced(candidate)
+        if len(candidate.regexes) > 0 and len(self.disabled(candidate)) > 0:
+            return False
+        if candidate.rule is not None and not self.holds(candidate.rule):
+            return False
+        if (candidate.rule is None or len(candidate.must_contain) > 0) and not any(self.fired(i) for i in candidate.must_contain):
+            return False
+        return not any(self.fired(i) for i in candidate.must_not_contain)
+
+    def _traced(self, candidate: Candidate) -> bool:
+        # Explain mode evaluates every filter of a candidate, so the trace shows what did not fire as well as what did.
+        filters = []
+        start = time.perf_counter()
+        for kind, indexes in [("must_contain", candidate.must_contain), ("must_not_contain", candidate.must_not_contain)]:
+            for index in indexes:
+                cached = index in self._fired
+                filter_start = time.perf_counter()
+                fired = self.fired(index)
+                elapsed = (time.perf_counter() - filter_start) * 1e6
+                regex = self.matcher._regex_filters.get(index)
+                trace = {"filter": self.matcher.filters[index], "kind": kind, "fired": fired, "cached": cached, "elapsed_us": round(elapsed, 2)}
+                if regex is not None:
+                    trace["kind"] = kind.replace("contain", "match")
+                    trace["regex"] = regex.stats
+                filters.append(trace)
+        rule: Optional[Dict[str, Any]] = None
+        holds = True
+        if candidate.rule is not None:
+            cached = candidate.rule in self._nodes
+            rule_start = time.perf_counter()
+            holds = self.holds(candidate.rule)
+            elapsed = (time.perf_counter() - rule_start) * 1e6
+            rule = {"rule": self.matcher.rules[candidate.answer], "holds": holds, "cached": cached, "elapsed_us": round(elapsed, 2)}
+        contains = any(self._fired[i] for i in candidate.must_contain) or (candidate.rule is not None and len(candidate.must_contain) == 0)
+        disabled = self.disabled(candidate)
+        accepted = holds and contains and not any(self._fired[i] for i in candidate.must_not_contain) and len(disabled) == 0
+        elapsed = (time.perf_counter() - start) * 1e6
+        trace = {"answer": candidate.answer, "priority": candidate.priority, "matched": accepted, "elapsed_us": round(elapsed, 2), "filters": filters}
+        if rule is not None:
+            trace["rule"] = rule
+        if len(disabled) > 0:
+            trace["disabled"] = disabled
+        self.explain.setdefault("candidates", []).append(trace)
+        return accepted
+
+
+class Matcher:
+    def __init__(self, answers: Mapping[str, Any], generation: int = 0, site: str = storage.default_site) -> None:
+        self.site: str = site
+        self.generation: int = generation
+        self.filters: List[str] = []
+        self.patterns: List[str] = []
+        self.candidates: List[Candidate] = []
+        self._pattern_filters: List[int] = []
+        self._rules: Dict[Tuple[Union[str, int], ...], Dict[str, List[int]]] = {}
+        self._rule_count: int = 0
+        self.program: rules.Program = rules.Program()
+        self.rules: Dict[str, str] = {}
+        self._regex_filters: Dict[int, patterns.Compiled] = {}
+        indexes: Dict[Tuple[bool, str], int] = {}
+
+        def index(entries: List[str], regex: bool = False) -> Tuple[int, ...]:
+            ids = []
+            for entry in entries:
+                if len(entry) > 0:
+                    key = (regex, entry)
+                    if key not in indexes:
+                        indexes[key] = len(self.filters)
+                        self.filters.append(entry)
+                        rule = parse_rule(entry) if not regex else None
+                        if regex:
+                            self._regex_filters[indexes[key]] = patterns.compiled(entry)
+                        elif rule is None:
+                            self.patterns.append(entry)
+                            self._pattern_filters.append(indexes[key])
+                        else:
+                            self._rules.setdefault(rule.segments, {}).setdefault(rule.value, []).append(indexes[key])
+                            self._rule_count += 1
+                    ids.append(indexes[key])
+            return tuple(ids)
+
+        for name, data in answers.items():
+            if name == "Default":
+                continue
+            must_contain = index(data.get("must_contain", [])) + index(data.get("must_match", []), regex=True)
+            must_not_contain = index(data.get("must_not_contain", [])) + index(data.get("must_not_match", []), regex=True)
+            invalid = [self.filters[i] for i in must_contain + must_not_contain if i in self._regex_filters and self._regex_filters[i].error is not None]
+            if len(invalid) > 0:
+                logger.warning(f"Answer '{name}' is skipped, its regex filters {invalid} are not allowed.")
+                continue
+            regexes = tuple(i for i in must_contain + must_not_contain if i in self._regex_filters)
+            disabled = [self.filters[i] for i in regexes if self._regex_filters[i].disabled]
+            if len(disabled) > 0:
+                logger.warning(f"Answer '{name}' is not matched while its regex filters {disabled} are disabled.")
+            rule = None
+            if isinstance(data.get("rule"), str) and data["rule"].strip() != "":
+                try:
+                    rule = self.program.compile(data["rule"])
+                except ValueError as e:
+                    logger.warning(f"Answer '{name}' is skipped, its rule does not compile: {e}")
+                    continue
+                self.rules[name] = data["rule"]
+            self.candidates.append(Candidate(answer=name, priority=priority(data), must_contain=must_contain, must_not_contain=must_not_contain, rule=rule, regexes=regexes))
+        # Highest priority first, answers with equal priority keep their storage order.
+        self.candidates.sort(key=lambda candidate: -candidate.priority)
+        # The positions of the candidates a filter can let in, and of those a rule or regex filter can let in without any other filter firing.
+        self._containing: Dict[int, List[int]] = {}
+        self._open: List[int] = []
+        for position, candidate in enumerate(self.candidates):
+            if (candidate.rule is not None and len(candidate.must_contain) == 0) or any(i in self._regex_filters for i in candidate.must_contain):
+                self._open.append(position)
+            for i in candidate.must_contain:
+                self._containing.setdefault(i, []).append(position)
+        self._automaton: Optional[Automaton] = Automaton(self.patterns) if len(self.patterns) > scan_threshold else None
+        logger.debug(
+            f"Compiled matcher for site '{site}' generation {generation} with {len(self.candidates)} answers, {len(self.patterns)} filters, {self._rule_count} field rules, {len(self._regex_filters)} regex filters and {len(self.program.nodes)} rule expression nodes."
+        )
+
+    def scan(self, system_info: sysinfo.Normalized) -> Set[int]:
+        if self._automaton is not None:
+            found = {self._pattern_filters[i] for i in self._automaton.search(system_info.raw)}
+        else:
+            found = {self._pattern_filters[i] for i, pattern in enumerate(self.patterns) if pattern in system_info.raw}
+        # Each path is looked up once per value in the payload, however many answers have rules on it.
+        for segments, rules in self._rules.items():
+            for value in system_info.values(segments):
+                ids = rules.get(sysinfo.text(value))
+                if ids is not None:
+                    found.update(ids)
+        return found
+
+    def match(self, system_info: sysinfo.Normalized, explain: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        evaluation = Evaluation(self, system_info, explain)
+        if explain is not None:
+            # Explain mode walks every candidate in order, so the trace also shows why the ones before the match failed.
+            for position, candidate in enumerate(self.candidates):
+                if evaluation.accepts(candidate):
+                    explain["not_evaluated"] = [remaining.answer for remaining in self.candidates[position + 1 :]]
+                    return candidate.answer
+            return None
+        positions = set(self._open)
+        for index in evaluation.found:
+            positions.update(self._containing.get(index, ()))
+        for position in sorted(positions):
+            if evaluation.accepts(self.candidates[position]):
+                return self.candidates[position].answer
+        return None
+
+
+_matchers: Dict[str, Matcher] = {}
+_building = threading.Lock()
+
+
+def matcher(site: str = storage.default_site) -> Matcher:
+    compiled = _matchers.get(site)
+    if compiled is None or compiled.generation != storage.snapshot(site).generation:
+        # Matchers are built on worker threads, the requests after an edit wait for one build instead of each making their own.
+        with _building:
+            compiled = _matchers.get(site)
+            current = storage.snapshot(site)
+            if compiled is None or compiled.generation != current.generation:
+                compiled = Matcher(current.answers, generation=current.generation, site=site)
+                _matchers[site] = compiled
+    return compiled
@@ -0,0 +1,62 @@
+from typing import Counter, Dict
+from dataclasses import dataclass, field
+import asyncio
+import collections
+import os
+from nicegui import Client
+from autopve import elements as el
+import logging
+
+logger = logging.getLogger(__name__)
+
+window = float(os.environ.get("AUTOPVE_NOTIFY_WINDOW", "2"))
+max_queued = int(os.environ.get("AUTOPVE_NOTIFY_QUEUE", "100"))
+summaries = {"answer": "answers served", "playbook": "playbooks executed"}
+
+
+@dataclass(kw_only=True)
+class Pending:
+    message: str
+    counts: Dict[str, Counter[str]] = field(default_factory=dict)
+    total: int = 0
+    queued: int = 0
+
+
+_pending: Dict[str, Pending] = {}
+
+
+def post(kind: str, target: str, message: str) -> None:
+    for client in Client.instances.values():
+        if not client.has_socket_connection:
+            continue
+        pending = _pending.get(client.id)
+        if pending is None:
+            pending = Pending(message=message)
+            _pending[client.id] = pending
+            asyncio.get_running_loop().call_later(window, _flush, client.id)
+        counts = pending.counts.setdefault(kind, collections.Counter())
+        if target not in counts and pending.queued >= max_queued:
+            target = "other"
+        if target not in counts:
+            pending.queued += 1
+        counts[target] += 1
+        pending.total += 1
+
+
+def summary(pending: Pending) -> str:
+    if pending.total == 1:
+        return pending.message
+    lines = []
+    for kind, counts in pending.counts.items():
+        details = ", ".join(f"{count} × {target}" for target, count in counts.most_common())
+        lines.append(f"{sum(counts.values())} {summaries.get(kind, kind)}: {details}")
+    return "\n".join(lines)
+
+
+def _flush(client_id: str) -> None:
+    pending = _pending.pop(client_id, None)
+    client = Client.instances.get(client_id)
+    if pending is None or client is None or not client.has_socket_connection:
+        return
+    with client:
+        el.Notification(summary(pending), type="positive", multi_line=pending.total > 1, timeout=15)
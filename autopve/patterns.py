@@ -0,0 +1,379 @@
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+from collections import Counter
+from dataclasses import dataclass
+import os
+import re
+import time
+from autopve import storage, sysinfo
+import logging
+
+try:
+    from re import _parser as sre_parse  # type: ignore
+    from re import _constants as sre_constants  # type: ignore
+except ImportError:
+    import sre_parse  # type: ignore
+    import sre_constants  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+budget = float(os.environ.get("AUTOPVE_REGEX_BUDGET_MS", "5")) / 1000
+strikes = int(os.environ.get("AUTOPVE_REGEX_STRIKES", "3"))
+max_input = int(os.environ.get("AUTOPVE_REGEX_MAX_INPUT", str(64 * 1024)))
+max_length = 512
+max_repeat = 1000
+max_ways = 100
+field_pattern = re.compile(r"^\s*(\S+)\s+~\s+(.*?)\s*$")
+
+repeats = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, "POSSESSIVE_REPEAT", sre_constants.MAX_REPEAT)}
+forbidden = {
+    sre_constants.GROUPREF: "backreferences",
+    sre_constants.GROUPREF_EXISTS: "conditional groups",
+    sre_constants.ASSERT: "lookarounds",
+    sre_constants.ASSERT_NOT: "lookarounds",
+}
+
+
+@dataclass(kw_only=True)
+class Compiled:
+    source: str
+    path: Optional[str] = None
+    segments: Optional[Tuple[Union[str, int], ...]] = None
+    pattern: Optional[re.Pattern] = None
+    error: Optional[str] = None
+    compile_us: float = 0
+    evaluations: int = 0
+    total_us: float = 0
+    max_us: float = 0
+    over_budget: int = 0
+    disabled: bool = False
+
+    def search(self, system_info: sysinfo.Normalized) -> bool:
+        if self.pattern is None or self.disabled:
+            return False
+        start = time.perf_counter()
+        # Only the start of very long text is searched, the patterns allowed take time in proportion to it.
+        if self.segments is None:
+            found = self.pattern.search(system_info.raw, 0, max_input) is not None
+        else:
+            found = any(self.pattern.search(sysinfo.text(value), 0, max_input) is not None for value in system_info.values(self.segments))
+        elapsed = time.perf_counter() - start
+        # Python regexes cannot be interrupted, so a pattern that keeps overrunning its budget is switched off until it is saved again.
+        self.evaluations += 1
+        self.total_us += elapsed * 1e6
+        self.max_us = max(self.max_us, elapsed * 1e6)
+        if elapsed > budget:
+            self.over_budget += 1
+            logger.warning(f"Regex filter '{self.source}' took {elapsed * 1000:.1f} ms, over its {budget * 1000:.1f} ms budget.")
+            if self.over_budget >= strikes:
+                self.disabled = True
+                logger.warning(f"Regex filter '{self.source}' is disabled after {self.over_budget} overruns, answers using it are not matched until they are saved again.")
+        return found
+
+    @property
+    def stats(self) -> str:
+        if self.error is not None:
+            return self.error
+        average = self.total_us / self.evaluations if self.evaluations > 0 else 0
+        text = f"compiled in {self.compile_us:.0f} µs, {self.evaluations} evaluations, average {average:.1f} µs, max {self.max_us:.1f} µs"
+        if self.over_budget > 0:
+            text = f"{text}, {self.over_budget} over budget"
+        if self.disabled:
+            text = f"{text}, DISABLED"
+        return text
+
+
+# Characters are tracked as ASCII code points, everything beyond ASCII falls into one of these four stand-ins.
+other_word, other_space, other_digit, other_rest = -1, -2, -3, -4
+empty = -5
+everything = frozenset(range(128)) | {other_word, other_space, other_digit, other_rest}
+ascii_digits = frozenset(range(ord("0"), ord("9") + 1))
+ascii_spaces = frozenset(ord(c) for c in " \t\n\r\f\v")
+ascii_word = ascii_digits | frozenset(ord(c) for c in "_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+digits = ascii_digits | {other_digit}
+spaces = ascii_spaces | {other_space}
+word = ascii_word | {other_word, other_digit}
+categories = {
+    "DIGIT": digits,
+    "NOT_DIGIT": everything - digits,
+    "SPACE": spaces,
+    "NOT_SPACE": everything - spaces,
+    "WORD": word,
+    "NOT_WORD": everything - word,
+}
+anchors = {sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING}
+single = {sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN}
+unbounded = float("inf")
+
+
+class _Unsafe(Exception):
+    pass
+
+
+@dataclass(kw_only=True)
+class _Item:
+    chars: FrozenSet[int]
+    low: float
+    high: float
+    # A loose item can match text of different lengths and gives some back when what follows fails.
+    loose: bool = False
+    # Alternatives that can start with the same character, each is a different way to match.
+    alternatives: int = 1
+    repeat: bool = False
+    # Matches or fails within a fixed number of characters, or is a repeat of such a body.
+    steady: bool = False
+    assertion: bool = False
+    anchor: bool = False
+
+    @property
+    def ways(self) -> float:
+        return (self.high - self.low + 1) * self.alternatives if self.loose else 1
+
+
+def _char(code: int, flags: int) -> FrozenSet[int]:
+    if code >= 128:
+        c = chr(code)
+        return frozenset({other_digit if c.isdigit() else other_word if c.isalnum() or c == "_" else other_space if c.isspace() else other_rest})
+    if flags & re.IGNORECASE and chr(code).isalpha():
+        return frozenset({ord(chr(code).lower()), ord(chr(code).upper())})
+    return frozenset({code})
+
+
+def _class(items: Any, flags: int) -> FrozenSet[int]:
+    chars: FrozenSet[int] = frozenset()
+    negate = False
+    for op, av in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            chars |= _char(av, flags)
+        elif op == sre_constants.RANGE:
+            low, high = av
+            chars |= frozenset(code for ascii in range(low, min(high, 127) + 1) for code in _char(ascii, flags))
+            if high >= 128:
+                chars |= everything - frozenset(range(128))
+        elif op == sre_constants.CATEGORY:
+            chars |= categories.get(str(av).replace("CATEGORY_", "").replace("UNI_", ""), everything)
+        else:
+            chars = everything
+    return everything - chars if negate else chars
+
+
+def _chars(op: Any, av: Any, flags: int) -> FrozenSet[int]:
+    if op == sre_constants.LITERAL:
+        return _char(av, flags)
+    if op == sre_constants.NOT_LITERAL:
+        return everything - _char(av, flags)
+    if op == sre_constants.ANY:
+        return everything if flags & re.DOTALL else everything - {ord("\n")}
+    return _class(av, flags)
+
+
+def _union(items: List[_Item]) -> FrozenSet[int]:
+    return frozenset().union(*(i.chars for i in items))
+
+
+def _first(items: List[_Item]) -> FrozenSet[int]:
+    chars: FrozenSet[int] = frozenset()
+    for i in items:
+        chars |= i.chars
+        if i.low > 0:
+            break
+    return chars
+
+
+def _ways(items: List[_Item]) -> float:
+    ways: float = 1
+    for i in items:
+        ways *= i.ways
+    return ways
+
+
+def _items(pattern: Any, flags: int) -> List[_Item]:
+    # The pattern as a flat sequence, groups are opened up while repeats, alternatives and atomic groups each become one item.
+    items: List[_Item] = []
+    for op, av in pattern:
+        if op in forbidden:
+            raise _Unsafe(f"{forbidden[op].capitalize()} are not allowed.")
+        if op in single:
+            items.append(_Item(chars=_chars(op, av, flags), low=1, high=1, steady=True))
+        elif op == sre_constants.AT:
+            anchor = av == sre_constants.AT_BEGINNING_STRING or (av == sre_constants.AT_BEGINNING and not flags & re.MULTILINE)
+            items.append(_Item(chars=frozenset(), low=0, high=0, assertion=True, anchor=anchor))
+        elif op == sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            items.extend(_items(body, (flags | add_flags) & ~del_flags))
+        elif op == getattr(sre_constants, "ATOMIC_GROUP", None):
+            inner = _check(_items(av, flags))
+            items.append(_Item(chars=_union(inner), low=sum(i.low for i in inner), high=sum(i.high for i in inner)))
+        elif op == sre_constants.BRANCH:
+            alternatives = [_check(_items(branch, flags)) for branch in av[1]]
+            # Alternatives that can match nothing overlap each other as much as ones starting with the same character.
+            firsts = [_first(alternative) | ({empty} if sum(i.low for i in alternative) == 0 else frozenset()) for alternative in alternatives]
+            overlapping = sum(1 for a, first in enumerate(firsts) if any(first & other for b, other in enumerate(firsts) if a != b))
+            low = min(sum(i.low for i in alternative) for alternative in alternatives)
+            high = max(sum(i.high for i in alternative) for alternative in alternatives)
+            loose = overlapping > 0 or low != high or any(i.loose for alternative in alternatives for i in alternative)
+            chars = frozenset().union(*(_union(alternative) for alternative in alternatives))
+            items.append(_Item(chars=chars, low=low, high=high, loose=loose, alternatives=max(overlapping, 1)))
+        elif op in repeats:
+            low, high, body = av
+            if high != sre_constants.MAXREPEAT and high > max_repeat:
+                raise _Unsafe(f"Repeats are limited to {max_repeat}.")
+            inner = _check(_items(body, flags))
+            count = unbounded if high == sre_constants.MAXREPEAT else high
+            if count > 1 and (any(i.alternatives > 1 for i in inner) or _overlapping(inner + inner)):
+                # One pass of the body can end in several places where the next one starts, the ways to split the text grow with every pass.
+                if low != count or _ways(inner) ** count > max_ways:
+                    raise _Unsafe("Nested repeats that can split the same text in more than one way are not allowed.")
+            width = sum(i.high for i in inner)
+            items.append(
+                _Item(
+                    chars=_union(inner),
+                    low=low * sum(i.low for i in inner),
+                    high=count * width if width > 0 else 0,
+                    loose=op != getattr(sre_constants, "POSSESSIVE_REPEAT", None) and (low != count or any(i.loose for i in inner)),
+                    repeat=True,
+                    steady=not any(i.loose for i in inner),
+                )
+            )
+        else:
+            items.append(_Item(chars=everything, low=0, high=unbounded, loose=True))
+    return items
+
+
+def _ambiguous(items: List[_Item], first: int, second: int) -> bool:
+    # Two loose items can trade characters when both can take the same ones and so can everything that has to match between them.
+    common = items[first].chars & items[second].chars
+    return len(common) > 0 and all(len(common & i.chars) > 0 for i in items[first + 1 : second] if i.low > 0)
+
+
+def _overlapping(items: List[_Item]) -> bool:
+    loose = [index for index, i in enumerate(items) if i.loose]
+    return any(_ambiguous(items, first, second) for n, first in enumerate(loose) for second in loose[n + 1 :])
+
+
+def _settled(items: List[_Item], index: int) -> bool:
+    # A repeat of a steady body at the end of the pattern never gives characters back, nothing after it can fail.
+    return items[index].repeat and items[index].steady and all(i.repeat and i.low == 0 for i in items[index + 1 :])
+
+
+def _check(items: List[_Item], searched: bool = False) -> List[_Item]:
+    # Loose items that can trade characters multiply each other's backtracking, at most one of them may be unbounded.
+    if searched and not (len(items) > 0 and items[0].anchor):
+        # A search tries every start, as if the pattern began with a lazy repeat of any character.
+        items = [_Item(chars=everything, low=0, high=unbounded, loose=True)] + items
+    loose = [index for index, i in enumerate(items) if i.loose]
+    groups: Dict[int, int] = {index: index for index in loose}
+
+    def group(index: int) -> int:
+        while groups[index] != index:
+            index = groups[index]
+        return index
+
+    for n, first in enumerate(loose):
+        for second in loose[n + 1 :]:
+            if not (searched and _settled(items, second)) and _ambiguous(items, first, second):
+                groups[group(second)] = group(first)
+    members: Dict[int, List[_Item]] = {}
+    for index in loose:
+        members.setdefault(group(index), []).append(items[index])
+    for grouped in members.values():
+        if len(grouped) < 2:
+            continue
+        if sum(1 for i in grouped if i.high == unbounded) > 1:
+            raise _Unsafe("Unbounded repeats that can match the same characters one after another are not allowed, anchor the pattern with ^ or separate them.")
+        if _ways([i for i in grouped if i.high != unbounded]) > max_ways:
+            raise _Unsafe(f"Repeats that can match the same characters one after another are limited to {max_ways} combinations.")
+    return items
+
+
+def _unsafe(pattern: Any) -> Optional[str]:
+    try:
+        _check(_items(pattern, pattern.state.flags), searched=True)
+    except _Unsafe as e:
+        return str(e)
+    return None
+
+
+def split(entry: str) -> Tuple[Optional[str], Optional[Tuple[Union[str, int], ...]], str]:
+    match = field_pattern.match(entry)
+    if match is not None:
+        segments = sysinfo.parse_path(match.group(1))
+        if segments is not None:
+            return match.group(1), segments, match.group(2)
+    return None, None, entry
+
+
+def check(entry: str) -> Optional[str]:
+    _, _, source = split(entry)
+    if len(source) > max_length:
+        return f"Patterns are limited to {max_length} characters."
+    try:
+        reason = _unsafe(sre_parse.parse(source))
+    except re.error as e:
+        return f"Invalid regex: {e}."
+    except RecursionError:
+        return "Pattern is nested too deeply."
+    return reason
+
+
+_compiled: Dict[str, Compiled] = {}
+
+
+def compiled(entry: str) -> Compiled:
+    entry_compiled = _compiled.get(entry)
+    if entry_compiled is None:
+        path, segments, source = split(entry)
+        start = time.perf_counter()
+        error = check(entry)
+        pattern = re.compile(source) if error is None else None
+        entry_compiled = Compiled(source=entry, path=path, segments=segments, pattern=pattern, error=error, compile_us=(time.perf_counter() - start) * 1e6)
+        if error is not None:
+            logger.warning(f"Regex filter '{entry}' is ignored: {error}")
+        _compiled[entry] = entry_compiled
+    return entry_compiled
+
+
+keys = ["must_match", "must_not_match"]
+
+
+_used: Dict[Tuple[str, str], List[str]] = {}
+_users: Counter = Counter()
+
+
+def _entries(data: Dict[str, Any]) -> List[str]:
+    return list(dict.fromkeys(entry for key in keys for entry in data.get(key, []) if len(entry) > 0))
+
+
+def _use(site: str, answer: str, entries: List[str]) -> None:
+    _users.subtract(_used.pop((site, answer), []))
+    if len(entries) > 0:
+        _used[(site, answer)] = entries
+        _users.update(entries)
+
+
+def _precompile(site: str, name: Optional[str]) -> None:
+    # Saving an answer compiles its patterns and gives disabled ones another chance, patterns no answer of any site uses are dropped.
+    answer_set = storage.answer_set(site)
+    changed = list(answer_set) if name is None else [name]
+    if name is None:
+        for answer in [answer for answer_site, answer in _used if answer_site == site and answer not in answer_set]:
+            _use(site, answer, [])
+    for answer in changed:
+        entries = _entries(answer_set.get(answer, {}))
+        _use(site, answer, entries)
+        for entry in entries:
+            entry_compiled = compiled(entry)
+            entry_compiled.disabled = False
+            entry_compiled.over_budget = 0
+    for entry in [entry for entry in list(_compiled) if _users[entry] <= 0]:
+        del _compiled[entry]
+    for entry in [entry for entry, count in _users.items() if count <= 0]:
+        del _users[entry]
+
+
+for answer_site in storage.sites():
+    for answer, data in storage.answer_set(answer_site).items():
+        _use(answer_site, answer, _entries(data))
+
+storage.on_answer_change(_precompile)
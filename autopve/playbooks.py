@@ -0,0 +1,136 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import os
+import watchfiles
+from nicegui import app
+import logging
+
+logger = logging.getLogger(__name__)
+
+root = "data/playbooks"
+
+
+@dataclass(kw_only=True)
+class File:
+    name: str
+    size: int
+    mtime: float
+    digest: str
+
+
+@dataclass(kw_only=True)
+class Playbook:
+    name: str
+    files: Dict[str, File] = field(default_factory=dict)
+
+    @property
+    def digest(self) -> str:
+        combined = hashlib.sha256()
+        for name in sorted(self.files):
+            combined.update(f"{name}\0{self.files[name].digest}\0".encode("utf-8"))
+        return combined.hexdigest()
+
+
+def _hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Registry:
+    # Playbooks known in memory, kept current by refreshing after our own changes and by watching the directory for everything else.
+    def __init__(self, root: str) -> None:
+        self.root: str = root
+        self._playbooks: Dict[str, Playbook] = {}
+        self._stop: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._playbooks
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._playbooks))
+
+    def __len__(self) -> int:
+        return len(self._playbooks)
+
+    def names(self) -> List[str]:
+        return list(self._playbooks)
+
+    def get(self, name: str) -> Optional[Playbook]:
+        return self._playbooks.get(name)
+
+    def scan(self) -> None:
+        found = sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir()) if os.path.isdir(self.root) else []
+        for name in [name for name in self._playbooks if name not in found]:
+            del self._playbooks[name]
+        for name in found:
+            self.refresh(name)
+        logger.info(f"Found {len(self._playbooks)} playbooks in '{self.root}'.")
+
+    def refresh(self, name: str) -> Optional[Playbook]:
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            self._playbooks.pop(name, None)
+            return None
+        previous = self._playbooks.get(name)
+        files: Dict[str, File] = {}
+        for entry in os.scandir(path):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+                known = previous.files.get(entry.name) if previous is not None else None
+                # A file is only hashed again when its size or modification time changed.
+                if known is not None and known.size == stat.st_size and known.mtime == stat.st_mtime:
+                    files[entry.name] = known
+                else:
+                    files[entry.name] = File(name=entry.name, size=stat.st_size, mtime=stat.st_mtime, digest=_hash(entry.path))
+            except OSError:
+                continue
+        playbook = Playbook(name=name, files=dict(sorted(files.items())))
+        self._playbooks[name] = playbook
+        return playbook
+
+    def _changed(self, changes: "set[Tuple[watchfiles.Change, str]]") -> None:
+        names = set()
+        for _, path in changes:
+            relative = os.path.relpath(path, self.root)
+            if relative == "." or relative.startswith(".."):
+                continue
+            names.add(relative.split(os.sep, 1)[0])
+        for name in names:
+            self.refresh(name)
+        logger.debug(f"Refreshed playbooks {sorted(names)} after changes on disk.")
+
+    async def _watch(self) -> None:
+        self._stop = asyncio.Event()
+        os.makedirs(self.root, exist_ok=True)
+        self.scan()
+        try:
+            async for changes in watchfiles.awatch(self.root, debounce=200, stop_event=self._stop):
+                self._changed(changes)
+        except Exception as e:
+            logger.warning(f"Stopped watching '{self.root}', playbooks changed outside autopve are not noticed: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch(), name="autopve playbook watcher")
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+registry = Registry(root)
+registry.scan()
+
+app.on_startup(registry.start)
+app.on_shutdown(registry.stop)
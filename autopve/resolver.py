@@ -0,0 +1,230 @@
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional, Tuple
+from dataclasses import dataclass, field, replace
+import collections
+import json
+import os
+import re
+import threading
+import time
+import tomlkit
+from autopve import inheritance, mappings, matcher, snapshots, storage, sysinfo, template, workers
+import logging
+
+logger = logging.getLogger(__name__)
+
+explain_all = os.environ.get("AUTOPVE_EXPLAIN", "FALSE") == "TRUE"
+sections = ["global", "network", "network.interface-name-pinning", "network.interface-name-pinning.mapping", "first-boot", "post-installation-webhook"]
+slot_pattern = re.compile("\ue000(\\d+)\ue001")
+empty_sections = ["global", "network", "first-boot", "network.interface-name-pinning.mapping", "post-installation-webhook", "disk-setup"]
+
+
+@dataclass(kw_only=True)
+class Resolved:
+    answer: str
+    site: str = storage.default_site
+    data: Dict[str, Any]
+    toml: str
+    body: bytes
+    generation: int
+    chunks: List[str] = field(default_factory=list)
+    templates: List[template.Template] = field(default_factory=list)
+    versions: Dict[str, int] = field(default_factory=dict)
+    content: Tuple[Optional[str], ...] = ()
+
+    @property
+    def version(self) -> int:
+        return self.versions.get(self.answer, 0)
+
+    def rendered(self, system_info: sysinfo.Normalized) -> Tuple[str, bytes]:
+        if len(self.templates) == 0:
+            return self.toml, self.body
+        toml = fill(self.chunks, [compiled.render(system_info) for compiled in self.templates])
+        return toml, toml.encode("utf-8")
+
+
+def fill(chunks: List[str], values: List[str]) -> str:
+    parts = chunks.copy()
+    for index, value in enumerate(values):
+        parts[index * 2 + 1] = json.dumps(value, ensure_ascii=False)[1:-1]
+    return "".join(parts)
+
+
+def merge(default_data: Mapping[str, Any], answer_data: Mapping[str, Any]) -> Dict[str, Any]:
+    data = snapshots.thaw(default_data)
+    answer_data = snapshots.thaw(answer_data)
+    for section in sections:
+        if section in data and section in answer_data:
+            data[section].update(answer_data[section])
+        elif section not in data and section in answer_data:
+            data[section] = answer_data[section]
+    if "disk-setup" in data and "disk-setup" in answer_data:
+        if any("filter" in k for k in answer_data["disk-setup"]) and "disk_list" in data["disk-setup"]:
+            del data["disk-setup"]["disk_list"]
+        if "disk_list" in answer_data["disk-setup"]:
+            for key in list(data["disk-setup"].keys()):
+                if "filter" in key:
+                    del data["disk-setup"][key]
+        data["disk-setup"].update(answer_data["disk-setup"])
+    elif "disk-setup" not in data and "disk-setup" in answer_data:
+        data["disk-setup"] = answer_data["disk-setup"]
+    return data
+
+
+def render(data: Dict[str, Any]) -> str:
+    for section in empty_sections:
+        if section in data and len(data[section]) == 0:
+            del data[section]
+    lines = []
+    for line in tomlkit.dumps(data).splitlines():
+        if len(line) > 0 and ((line[0] == '"' and line.split("=")[0].count(".") > 0) or (line[:2] == '["')):
+            line = line.replace('"', "", 2)
+        lines.append(line + "\n")
+    return "".join(lines)
+
+
+def slots(data: Any, templates: List[template.Template]) -> Any:
+    # Templated values are swapped for numbered placeholders that survive TOML rendering and are filled in per request.
+    if isinstance(data, str):
+        compiled = template.parsed(data)
+        if compiled is None:
+            return data
+        templates.append(compiled)
+        return f"\ue000{len(templates) - 1}\ue001"
+    if isinstance(data, dict):
+        return {key: slots(value, templates) for key, value in data.items()}
+    if isinstance(data, list):
+        return [slots(value, templates) for value in data]
+    return data
+
+
+def resolve(name: str, site: str = storage.default_site) -> Resolved:
+    lineage = inheritance.chain(name, site)
+    current = storage.snapshot(site)
+    live = {ancestor: storage.live(ancestor, site) for ancestor in lineage}
+    versions = {ancestor: version for ancestor, (version, _) in live.items()}
+    content = tuple(text for _, text in live.values())
+    # After a rollback the answers are the same as for an earlier rendering, which is reused instead of rendered again.
+    with _lock:
+        retired = _retired.get((site, name, content))
+    if retired is not None:
+        return replace(retired, generation=current.generation, versions=versions)
+    data = merge(current.get("Default"), {})
+    for ancestor in lineage[1:]:
+        data = merge(data, current.get(ancestor))
+    templates: List[template.Template] = []
+    toml = render(slots(data, templates))
+    chunks = slot_pattern.split(toml)
+    templates = [templates[int(index)] for index in chunks[1::2]]
+    if len(templates) > 0:
+        toml = fill(chunks, [compiled.source for compiled in templates])
+    return Resolved(
+        answer=name,
+        site=site,
+        data=data,
+        toml=toml,
+        body=toml.encode("utf-8"),
+        generation=current.generation,
+        chunks=chunks,
+        templates=templates,
+        versions=versions,
+        content=content,
+    )
+
+
+_resolved: Dict[str, Dict[str, Resolved]] = {}
+_retired: "collections.OrderedDict[Tuple[str, str, Tuple[Optional[str], ...]], Resolved]" = collections.OrderedDict()
+retired_entries = 256
+# Answers are rendered on worker threads while edits drop them on the event loop.
+_lock = threading.Lock()
+
+
+def _retire(entry: Resolved) -> None:
+    key = (entry.site, entry.answer, entry.content)
+    _retired.pop(key, None)
+    _retired[key] = entry
+    while len(_retired) > retired_entries:
+        _retired.popitem(last=False)
+
+
+def _invalidate(site: str, name: Optional[str]) -> None:
+    with _lock:
+        if name is None or name == "Default":
+            stale = list(_resolved.pop(site, {}).values())
+        else:
+            cache = _resolved.get(site, {})
+            stale = [cache.pop(answer) for answer in inheritance.descendants(name, site) | {name} if answer in cache]
+        for entry in stale:
+            _retire(entry)
+
+
+storage.on_answer_change(_invalidate)
+
+
+def resolved(name: str, site: str = storage.default_site) -> Resolved:
+    entry = _resolved.get(site, {}).get(name)
+    if entry is None:
+        entry = resolve(name, site)
+        with _lock:
+            # A rendering an edit overtook is served to this request but not kept, the edit has already dropped the answer.
+            if storage.snapshot(site).generation == entry.generation:
+                _resolved.setdefault(site, {})[name] = entry
+        logger.debug(f"Rendered answer '{name}' of site '{site}' at generation {entry.generation}.")
+    return entry
+
+
+def choose(
+    system_info: sysinfo.Normalized,
+    compiled: matcher.Matcher,
+    table: Optional[Dict[str, str]] = None,
+    answers: Optional[AbstractSet[str]] = None,
+    explain: Optional[Dict[str, Any]] = None,
+) -> str:
+    start = time.perf_counter()
+    answer = mappings.lookup(system_info, table=table, answers=answers if answers is not None else storage.snapshot(compiled.site).names)
+    if explain is not None:
+        explain["mapping"] = answer
+    if answer is None:
+        answer = compiled.match(system_info, explain)
+    answer = answer if answer is not None else "Default"
+    if explain is not None:
+        explain["answer"] = answer
+        explain["elapsed_us"] = round((time.perf_counter() - start) * 1e6, 2)
+    return answer
+
+
+def explaining(flag: Optional[str]) -> bool:
+    if flag is None:
+        return explain_all
+    return flag.lower() not in ["", "0", "false", "no"]
+
+
+def serve(document: bytes, site: str = storage.default_site, explain: Optional[Dict[str, Any]] = None) -> Tuple[sysinfo.Normalized, Resolved, Tuple[str, bytes]]:
+    # Runs on a worker thread, after an edit the matcher is built and the answer rendered again here rather than on the event loop.
+    system_info = sysinfo.normalize(json.loads(document))
+    name = choose(system_info, matcher.matcher(site), explain=explain)
+    # The history indexes are computed here too so adding the request to the history stays cheap.
+    _ = system_info.items, system_info.paths
+    entry = resolved(name, site)
+    return system_info, entry, entry.rendered(system_info)
+
+
+async def select_many(documents: List[Dict[str, Any]], explains: Optional[List[Dict[str, Any]]] = None, site: str = storage.default_site) -> List[Tuple[str, sysinfo.Normalized]]:
+    table = dict(storage.mappings)
+    answers = storage.snapshot(site).names
+
+    def work() -> List[Tuple[str, sysinfo.Normalized]]:
+        compiled = matcher.matcher(site)
+        selected: Dict[str, Tuple[str, sysinfo.Normalized, Optional[Dict[str, Any]]]] = {}
+        results = []
+        for document in documents:
+            system_info = sysinfo.normalize(document)
+            if system_info.raw not in selected:
+                explain: Optional[Dict[str, Any]] = {} if explains is not None else None
+                selected[system_info.raw] = (choose(system_info, compiled, table=table, answers=answers, explain=explain), system_info, explain)
+            answer, system_info, explain = selected[system_info.raw]
+            results.append((answer, system_info))
+            if explains is not None and explain is not None:
+                explains.append(explain)
+        return results
+
+    return await workers.batch.run(work)
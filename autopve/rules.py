@@ -0,0 +1,220 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import json
+import re
+from autopve import sysinfo
+import logging
+
+logger = logging.getLogger(__name__)
+
+token_pattern = re.compile(r"""\s*(?:("(?:[^"\\]|\\.)*")|(==|!=|>=|<=|>|<|\(|\)|,)|([^\s()"=!<>,]+))""")
+keywords = {"and", "or", "not", "contains", "count"}
+comparisons = {"==", "!=", ">", ">=", "<", "<=", "contains"}
+
+Node = Tuple[Any, ...]
+Values = Callable[[Tuple[Union[str, int], ...]], List[Any]]
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def compare(item: Any, op: str, value: Union[str, float]) -> bool:
+    if op == "contains":
+        return str(value) in sysinfo.text(item)
+    if isinstance(value, float):
+        number = _number(item)
+        if number is None:
+            return False
+        if op == "==":
+            return number == value
+        if op == ">":
+            return number > value
+        if op == ">=":
+            return number >= value
+        if op == "<":
+            return number < value
+        if op == "<=":
+            return number <= value
+        return False
+    return op == "==" and sysinfo.text(item) == value
+
+
+class Parser:
+    def __init__(self, program: "Program", expression: str) -> None:
+        self.program: Program = program
+        self.expression: str = expression
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        while position < len(expression):
+            match = token_pattern.match(expression, position)
+            if match is None or match.end() == position:
+                if expression[position:].strip() == "":
+                    break
+                raise ValueError(f"Unexpected '{expression[position:].strip()[:20]}' in rule.")
+            string, symbol, word = match.groups()
+            if string is not None:
+                self.tokens.append(("string", json.loads(string)))
+            elif symbol is not None:
+                self.tokens.append(("symbol", symbol))
+            elif word is not None:
+                self.tokens.append(("keyword" if word.lower() in keywords else "word", word.lower() if word.lower() in keywords else word))
+            position = match.end()
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ("end", "")
+
+    def take(self, kind: Optional[str] = None, value: Optional[str] = None) -> Tuple[str, str]:
+        token = self.peek()
+        if (kind is not None and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value if value is not None else kind
+            found = token[1] if token[0] != "end" else "end of rule"
+            raise ValueError(f"Expected {expected} but found '{found}' in rule.")
+        self.position += 1
+        return token
+
+    def parse(self) -> int:
+        if len(self.tokens) == 0:
+            raise ValueError("Rule is empty.")
+        node = self.any_of()
+        if self.peek()[0] != "end":
+            raise ValueError(f"Unexpected '{self.peek()[1]}' in rule.")
+        return node
+
+    def any_of(self) -> int:
+        children = [self.all_of()]
+        while self.peek() == ("keyword", "or"):
+            self.take()
+            children.append(self.all_of())
+        return children[0] if len(children) == 1 else self.program.add(("or", tuple(children)))
+
+    def all_of(self) -> int:
+        children = [self.negation()]
+        while self.peek() == ("keyword", "and"):
+            self.take()
+            children.append(self.negation())
+        return children[0] if len(children) == 1 else self.program.add(("and", tuple(children)))
+
+    def negation(self) -> int:
+        if self.peek() == ("keyword", "not"):
+            self.take()
+            return self.program.add(("not", self.negation()))
+        return self.atom()
+
+    def atom(self) -> int:
+        kind, value = self.peek()
+        if (kind, value) == ("symbol", "("):
+            self.take()
+            node = self.any_of()
+            self.take("symbol", ")")
+            return node
+        if kind == "string":
+            self.take()
+            return self.program.add(("text", value))
+        if (kind, value) == ("keyword", "count"):
+            return self.count()
+        segments = self.path()
+        op, operand = self.comparison()
+        if op == "!=":
+            return self.program.add(("not", self.program.add(("compare", segments, "==", operand))))
+        return self.program.add(("compare", segments, op, operand))
+
+    def path(self) -> Tuple[Union[str, int], ...]:
+        _, path = self.take("word")
+        segments = sysinfo.parse_path(path)
+        if segments is None:
+            raise ValueError(f"Invalid system info path '{path}' in rule.")
+        return segments
+
+    def operand(self) -> Union[str, float]:
+        kind, value = self.peek()
+        if kind not in ["string", "word"]:
+            raise ValueError(f"Expected a value but found '{value or 'end of rule'}' in rule.")
+        self.take()
+        if kind == "word" and _number(value) is not None:
+            return float(value)
+        return value
+
+    def comparison(self) -> Tuple[str, Union[str, float]]:
+        kind, op = self.peek()
+        if op not in comparisons or kind not in ["symbol", "keyword"]:
+            raise ValueError(f"Expected a comparison but found '{op or 'end of rule'}' in rule.")
+        self.take()
+        operand = self.operand()
+        if op in [">", ">=", "<", "<="] and not isinstance(operand, float):
+            raise ValueError(f"'{op}' needs a number in rule.")
+        return op, operand
+
+    def count(self) -> int:
+        self.take("keyword", "count")
+        self.take("symbol", "(")
+        segments = self.path()
+        condition: Optional[Tuple[str, Union[str, float]]] = None
+        if self.peek() != ("symbol", ")"):
+            condition = self.comparison()
+        self.take("symbol", ")")
+        op, operand = self.comparison()
+        if not isinstance(operand, float) or op == "contains":
+            raise ValueError("count() must be compared with a number in rule.")
+        return self.program.add(("count", segments, condition, op, operand))
+
+
+class Program:
+    def __init__(self) -> None:
+        self.nodes: List[Node] = []
+        self._ids: Dict[Node, int] = {}
+
+    def add(self, node: Node) -> int:
+        # Identical subexpressions share one node, so they are evaluated once per request across every answer.
+        index = self._ids.get(node)
+        if index is None:
+            index = len(self.nodes)
+            self.nodes.append(node)
+            self._ids[node] = index
+        return index
+
+    def compile(self, expression: str) -> int:
+        return Parser(self, expression).parse()
+
+    def evaluate(self, index: int, system_info_raw: str, values: Values, memo: Dict[int, bool]) -> bool:
+        result = memo.get(index)
+        if result is not None:
+            return result
+        node = self.nodes[index]
+        kind = node[0]
+        if kind == "text":
+            result = node[1] in system_info_raw
+        elif kind == "compare":
+            _, segments, op, operand = node
+            result = any(compare(item, op, operand) for item in values(segments))
+        elif kind == "count":
+            _, segments, condition, op, operand = node
+            items = values(segments)
+            if condition is not None:
+                items = [item for item in items if compare(item, condition[0], condition[1])]
+            result = compare(len(items), op, operand)
+        elif kind == "not":
+            result = not self.evaluate(node[1], system_info_raw, values, memo)
+        elif kind == "and":
+            result = all(self.evaluate(child, system_info_raw, values, memo) for child in node[1])
+        else:
+            result = any(self.evaluate(child, system_info_raw, values, memo) for child in node[1])
+        memo[index] = result
+        return result
+
+
+def check(expression: str) -> Optional[str]:
+    try:
+        Program().compile(expression)
+    except ValueError as e:
+        return str(e)
+    return None
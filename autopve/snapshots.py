@@ -0,0 +1,48 @@
+from typing import Any, Dict, FrozenSet, Mapping, Optional
+from dataclasses import dataclass, field
+import types
+
+
+def freeze(data: Any) -> Any:
+    if isinstance(data, dict):
+        return types.MappingProxyType({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(value) for value in data)
+    return data
+
+
+def thaw(data: Any) -> Any:
+    if isinstance(data, Mapping):
+        return {key: thaw(value) for key, value in data.items()}
+    if isinstance(data, tuple):
+        return [thaw(value) for value in data]
+    return data
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    site: str
+    generation: int
+    answers: Mapping[str, Mapping[str, Any]]
+    names: FrozenSet[str]
+    # The stored answer each frozen answer was made from, an answer that is still the same object is shared with the next snapshot.
+    sources: Mapping[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    def get(self, name: str) -> Mapping[str, Any]:
+        return self.answers.get(name, types.MappingProxyType({}))
+
+
+def build(site: str, generation: int, answers: Dict[str, Any], previous: Optional[Snapshot] = None, name: Optional[str] = None) -> Snapshot:
+    frozen: Dict[str, Mapping[str, Any]] = {}
+    for answer, data in answers.items():
+        if previous is not None and answer != name and previous.sources.get(answer) is data:
+            frozen[answer] = previous.answers[answer]
+        else:
+            frozen[answer] = freeze(data)
+    return Snapshot(
+        site=site,
+        generation=generation,
+        answers=types.MappingProxyType(frozen),
+        names=frozenset(frozen),
+        sources=types.MappingProxyType(dict(answers)),
+    )
@@ -1,22 +1,25 @@
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
 import json
 import os
 import shutil
 from nicegui import app
+from nicegui.events import ObservableChangeEventArguments
+from nicegui.observables import ObservableDict
+from autopve import database, snapshots, writer
+from autopve.filestore import store as file_store
+from autopve.playbooks import registry as playbook_registry
 import logging
 
 logger = logging.getLogger(__name__)
 configs_version = int(100)
 configs_version_string = f"config_{configs_version}"
-root = app.storage.general.get(configs_version_string, None)
-if root is None:
-    logger.warning(f"Storage version not found, updating version to {configs_version}.")
-    logger.warning(f"Connections cleared, repeat setup procedure.")
-    app.storage.general[configs_version_string] = {}
-answers: Dict[str, Any] = app.storage.general[configs_version_string]
+sites_version_string = f"sites_{configs_version}"
+database_path = "data/autopve.db"
+default_site = "default"
 
-if "Default" not in answers:
-    answers["Default"] = {
+
+def default_answer() -> Dict[str, Any]:
+    return {
         "global": {
             "keyboard": "de",
             "country": "at",
@@ -36,30 +39,226 @@ if "Default" not in answers:
     }
 
 
-def answer(name: str, copy: bool = False) -> dict:
-    if name not in answers:
-        answers[name] = {}
+database.connect(database_path)
+if database.empty():
+    # Answers used to live in the general storage file, they are moved to the database once.
+    legacy: Dict[str, Any] = {}
+    if configs_version_string in app.storage.general:
+        legacy[default_site] = app.storage.general[configs_version_string]
+    legacy.update(app.storage.general.get(sites_version_string, {}))
+    if any(len(site_answers) > 0 for site_answers in legacy.values()):
+        count = database.migrate(json.loads(json.dumps(legacy)))
+        logger.warning(f"Moved {count} answers from the general storage to '{database_path}'.")
+    else:
+        logger.warning(f"Storage version not found, updating version to {configs_version}.")
+        logger.warning(f"Connections cleared, repeat setup procedure.")
+    app.storage.general.pop(configs_version_string, None)
+    app.storage.general.pop(sites_version_string, None)
+stored = database.load()
+answers: Dict[str, Any] = ObservableDict(stored.pop(default_site, {}))
+_sites: Dict[str, Dict[str, Any]] = ObservableDict(stored)
+
+
+mappings_version_string = f"mappings_{configs_version}"
+if mappings_version_string not in app.storage.general:
+    app.storage.general[mappings_version_string] = {}
+mappings: Dict[str, str] = app.storage.general[mappings_version_string]
+
+
+def sites() -> List[str]:
+    return [default_site] + list(_sites.keys())
+
+
+def answer_set(site: str = default_site) -> Dict[str, Any]:
+    return answers if site == default_site else _sites.get(site, {})
+
+
+def add_site(site: str) -> None:
+    if site != default_site and site not in _sites:
+        _sites[site] = {"Default": default_answer()}
+
+
+def remove_site(site: str) -> None:
+    _sites.pop(site, None)
+
+
+def answer_names() -> List[str]:
+    return list(dict.fromkeys(name for site in sites() for name in answer_set(site).keys()))
+
+
+generations: Dict[str, int] = {}
+_answer_handlers: List[Callable[[str, Optional[str]], None]] = []
+_known: Set[str] = set(sites())
+
+
+def on_answer_change(handler: Callable[[str, Optional[str]], None]) -> None:
+    _answer_handlers.append(handler)
+
+
+def _key(collection: Any, child: Any) -> Optional[str]:
+    for key, value in collection.items():
+        if value is child:
+            return key
+    return None
+
+
+def _changed_answer(collection: Any) -> Tuple[Optional[str], Optional[str]]:
+    lineage = []
+    while collection is not None and collection is not answers and collection is not _sites:
+        lineage.append(collection)
+        collection = collection._parent
+    if collection is answers:
+        return default_site, _key(answers, lineage[-1]) if lineage else None
+    if collection is _sites and lineage:
+        site = _key(_sites, lineage[-1])
+        return site, _key(lineage[-1], lineage[-2]) if site is not None and len(lineage) > 1 else None
+    return None, None
+
+
+def _answers_changed(e: ObservableChangeEventArguments) -> None:
+    global _known
+    site, name = _changed_answer(e.sender)
+    # Adding or removing a site only notifies that site, so a removed site's caches are dropped and the others are kept.
+    current = set(sites())
+    changed = [site] if site is not None else sorted((current ^ _known) or current)
+    _known = current
+    for site in changed:
+        generations[site] = generations.get(site, 0) + 1
+        for handler in _answer_handlers:
+            handler(site, name)
+
+
+answers.on_change(_answers_changed)
+_sites.on_change(_answers_changed)
+
+
+def _write_answers(changes: Dict[Tuple[str, Optional[str]], None]) -> None:
+    # An edit to one answer writes its row, adding, renaming or removing answers or sites syncs the rows of the site.
+    for site in dict.fromkeys(site for site, _ in changes):
+        data = answer_set(site)
+        names = [name for changed, name in changes if changed == site]
+        if None in names or any(name not in data for name in names):
+            database.sync(site, data)
+        else:
+            for name in names:
+                database.save(site, name, data[name])
+
+
+def _write_playbooks(files: Dict[str, str]) -> None:
+    writer.write_files(files)
+    for name in dict.fromkeys(path.split("/")[2] for path in files):
+        playbook_registry.refresh(name)
+
+
+# Typing into an answer changes it on every keystroke, the rows are written once the edits settle.
+answer_writes: writer.Batch[Tuple[str, Optional[str]], None] = writer.Batch("answers", _write_answers)
+playbook_writes: writer.Batch[str, str] = writer.Batch("playbook files", _write_playbooks)
+
+
+def _persist(site: str, name: Optional[str]) -> None:
+    answer_writes.put((site, name), None)
+
+
+def flush() -> None:
+    answer_writes.flush()
+    playbook_writes.flush()
+
+
+def _shutdown() -> None:
+    flush()
+    database.close()
+
+
+_snapshots: Dict[str, snapshots.Snapshot] = {}
+
+
+def snapshot(site: str = default_site) -> snapshots.Snapshot:
+    # Requests read answers from here, a snapshot never changes and is replaced as a whole after every edit.
+    current = _snapshots.get(site)
+    if current is None:
+        return snapshots.Snapshot(site=site, generation=generations.get(site, 0), answers={}, names=frozenset())
+    return current
+
+
+def _publish(site: str, name: Optional[str]) -> None:
+    if site in sites():
+        _snapshots[site] = snapshots.build(site, generations.get(site, 0), answer_set(site), _snapshots.get(site), name)
+    else:
+        _snapshots.pop(site, None)
+
+
+on_answer_change(_persist)
+on_answer_change(_publish)
+app.on_shutdown(_shutdown)
+if "Default" not in answers:
+    answers["Default"] = default_answer()
+for site in sites():
+    _publish(site, None)
+
+
+def live(name: str, site: str = default_site) -> Tuple[int, Optional[str]]:
+    # The version and stored text of an answer as requests see it, nothing is written for it.
+    # An edit still waiting to be saved counts as the version it is recorded as when the batch is written.
+    # The answer is read from its snapshot, which workers can do while it is being edited.
+    data = snapshot(site).answers.get(name)
+    text = json.dumps(snapshots.thaw(data)) if data is not None else None
+    saved = database.version(site, name)
+    return (saved + 1 if text != database.row(site, name) else saved), text
+
+
+def version(name: str, site: str = default_site) -> int:
+    return live(name, site)[0]
+
+
+def revisions(name: str, site: str = default_site) -> List[database.Revision]:
+    answer_writes.flush(lambda key: key[0] == site)
+    return database.revisions(site, name)
+
+
+def revision(name: str, version: int, site: str = default_site) -> Optional[Dict[str, Any]]:
+    answer_writes.flush(lambda key: key[0] == site)
+    return database.revision(site, name, version)
+
+
+def rollback(name: str, target: int, site: str = default_site) -> int:
+    data = revision(name, target, site)
+    if data is None:
+        raise ValueError(f"Answer '{name}' has no version {target} to roll back to.")
+    # Replacing the answer as a whole is a single change, requests see either the old or the rolled back answer.
+    answer_set(site)[name] = data
+    logger.warning(f"Rolled answer '{name}' of site '{site}' back to version {target}.")
+    return version(name, site)
+
+
+def answer(name: str, copy: bool = False, site: str = default_site) -> dict:
+    data = answer_set(site)
+    if name not in data:
+        data[name] = {}
     if copy is False:
-        return answers[name]
+        return data[name]
     else:
-        return json.loads(json.dumps(answers[name]))
+        return snapshots.thaw(snapshot(site).get(name))
 
 
 def playbooks():
-    return os.listdir("data/playbooks")
+    return playbook_registry.names()
 
 
 def get_playbook(name: str, file: str):
     path = f"data/playbooks/{name}/{file}"
+    if playbook_writes.pending(path):
+        return playbook_writes.get(path)
     if os.path.exists(path):
         with open(path, "r") as f:
             return f.read()
 
 
 def set_playbook(name: str, file: str, data: str):
-    path = f"data/playbooks/{name}/{file}"
-    with open(path, "w") as f:
-        f.write(data)
+    playbook_writes.put(f"data/playbooks/{name}/{file}", data)
+
+
+def flush_playbook(name: str):
+    playbook_writes.flush(lambda path: path.startswith(f"data/playbooks/{name}/"))
 
 
 ansible_cfg_template = """[defaults]
@@ -128,33 +327,37 @@ def mk_playbook(name: str):
         open(f"{path}/requirements.yaml", "x").close()
         with open(f"{path}/ansible.cfg", "w") as f:
             f.write(ansible_cfg_template)
+    playbook_registry.refresh(name)
 
 
 def rm_playbook(name: str):
     path = f"data/playbooks/{name}"
+    playbook_writes.discard(lambda file: file.startswith(f"{path}/"))
     if os.path.exists(path):
         shutil.rmtree(path, ignore_errors=True)
+    playbook_registry.refresh(name)
 
 
 def cp_playbook(src_name: str, dest_name: str):
     src_path = f"data/playbooks/{src_name}"
+    flush_playbook(src_name)
     if os.path.exists(src_path):
         rm_playbook(dest_name)
         shutil.copytree(src_path, f"data/playbooks/{dest_name}")
+        playbook_registry.refresh(dest_name)
 
 
 def files():
-    return os.listdir("data/files")
+    return file_store.names()
 
 
 def mk_file(name: str, data):
-    path = f"data/files/{name}"
-    if not os.path.exists(path):
-        with open(path, "wb") as dest:
-            shutil.copyfileobj(data, dest)
+    file_store.put(name, data)
+
+
+async def receive_file(name: str, chunks: AsyncIterator[bytes], size: Optional[int] = None):
+    return await file_store.receive(name, chunks, size)
 
 
 def rm_file(name: str):
-    path = f"data/files/{name}"
-    if os.path.exists(path):
-        os.remove(path)
+    file_store.remove(name)
@@ -0,0 +1,112 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+import functools
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+key_pattern = r"""[^.\[\]\s=!~"':]+"""
+segment_pattern = re.compile(rf"({key_pattern})|\[(\*|\d+)\]")
+path_pattern = re.compile(rf"{key_pattern}(?:\[(?:\*|\d+)\])*(?:\.{key_pattern}(?:\[(?:\*|\d+)\])*)*")
+
+
+def parse_path(path: str) -> Optional[Tuple[Union[str, int], ...]]:
+    if path_pattern.fullmatch(path) is None:
+        return None
+    segments: List[Union[str, int]] = []
+    for key, index in segment_pattern.findall(path):
+        if key:
+            segments.append(key)
+        elif index == "*":
+            segments.append("*")
+        else:
+            segments.append(int(index))
+    return tuple(segments)
+
+
+def text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def values(data: Any, segments: Tuple[Union[str, int], ...]) -> List[Any]:
+    found = [data]
+    for segment in segments:
+        next_found = []
+        for item in found:
+            if isinstance(segment, int):
+                if isinstance(item, list) and -len(item) <= segment < len(item):
+                    next_found.append(item[segment])
+            elif segment == "*":
+                if isinstance(item, list):
+                    next_found.extend(item)
+            elif isinstance(item, dict) and segment in item:
+                next_found.append(item[segment])
+        found = next_found
+    return found
+
+
+_keys: Dict[Tuple[Union[str, int], ...], Optional[str]] = {}
+
+
+def key(segments: Tuple[Union[str, int], ...]) -> Optional[str]:
+    if segments not in _keys:
+        path: Optional[str] = ""
+        for segment in segments:
+            if isinstance(segment, int):
+                path = None
+                break
+            path = f"{path}[*]" if segment == "*" else (f"{path}.{segment}" if path else str(segment))
+        _keys[segments] = path
+    return _keys[segments]
+
+
+class Normalized:
+    # One pass over a request's system information that matching, templates, mappings and history all read from.
+    def __init__(self, data: Any) -> None:
+        self.data: Any = data
+        self.raw: str = json.dumps(data)
+        self.nodes: Dict[str, List[Any]] = {}
+        self.pairs: List[Tuple[str, Any]] = []
+        self._walk(data, "")
+
+    def _walk(self, item: Any, prefix: str) -> None:
+        if prefix:
+            nodes = self.nodes.get(prefix)
+            if nodes is None:
+                self.nodes[prefix] = [item]
+            else:
+                nodes.append(item)
+        if isinstance(item, dict):
+            for name, value in item.items():
+                self._walk(value, f"{prefix}.{name}" if prefix else str(name))
+        elif isinstance(item, list):
+            for value in item:
+                self._walk(value, f"{prefix}[*]")
+        elif prefix:
+            self.pairs.append((prefix, item))
+
+    def values(self, segments: Tuple[Union[str, int], ...]) -> List[Any]:
+        path = key(segments)
+        if path is None:
+            return values(self.data, segments)
+        return self.nodes.get(path, [])
+
+    @functools.cached_property
+    def paths(self) -> List[str]:
+        return list(dict.fromkeys(path for path, _ in self.pairs))
+
+    @functools.cached_property
+    def items(self) -> List[str]:
+        found: Dict[str, None] = {}
+        for path, value in self.pairs:
+            if path.endswith("]") or value is None or isinstance(value, float) or value == "":
+                continue
+            found[f"{json.dumps(path.rsplit('.', 1)[-1])}: {json.dumps(value)}"] = None
+        return list(found)
+
+
+def normalize(data: Any) -> Normalized:
+    return data if isinstance(data, Normalized) else Normalized(data)
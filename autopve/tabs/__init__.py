@@ -1,5 +1,6 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Union
 from dataclasses import dataclass, field
+from autopve import storage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,17 +11,29 @@ class Share:
     answer_history: List[Dict[str, Any]] = field(default_factory=list)
     last_timestamp: float = 0
     unique_system_information: List[str] = field(default_factory=list)
+    unique_system_information_index: Set[str] = field(default_factory=set)
+    unique_system_paths: List[str] = field(default_factory=list)
+    unique_system_paths_index: Set[str] = field(default_factory=set)
     playbook_history: List[Dict[str, Any]] = field(default_factory=list)
 
 
 class Tab:
     _share: Share = Share()
+    _shares: Dict[str, Share] = {storage.default_site: _share}
 
-    def __init__(self, answer: str, type: Optional[str] = None) -> None:
+    def __init__(self, answer: str, type: Optional[str] = None, site: str = storage.default_site) -> None:
         self.answer: str = answer
         self.type: Optional[str] = type
+        self.site: str = site
+        self._share: Share = Tab.share(site)
         self._elements: Dict[str, Any] = {}
         self._build()
 
+    @classmethod
+    def share(cls, site: str) -> Share:
+        if site not in Tab._shares:
+            Tab._shares[site] = Share()
+        return Tab._shares[site]
+
     def _build(self):
         pass
@@ -2,12 +2,11 @@ import asyncio
 from typing import Any, Dict, List, Optional, Union
 from dataclasses import dataclass, field
 import time
-import json
-import re
 from copy import copy, deepcopy
 from nicegui import app, ui  # type: ignore
-from . import Tab
+from . import Share, Tab
 from autopve import elements as el
+from autopve import admission, idempotency, storage, sysinfo, workers
 from autopve.interfaces import cli
 import logging
 
@@ -39,7 +38,12 @@ def update_grids():
 class AnswerRequest:
     answer: str
     response: str
+    # The version of every answer in the lineage, Default first, so an edit to one it extends can be traced too.
+    versions: Dict[str, int] = field(default_factory=dict)
+    site: str = storage.default_site
     system_info: Dict[str, Any] = field(default_factory=dict)
+    normalized: Optional[sysinfo.Normalized] = field(default=None, repr=False)
+    explain: Optional[Dict[str, Any]] = None
     timestamp: float = field(default_factory=time.time)
 
     @property
@@ -50,12 +54,21 @@ class AnswerRequest:
                     return self.system_info["dmi"]["system"]["name"]
         return ""
 
+    @property
+    def version(self) -> int:
+        return self.versions.get(self.answer, 0)
+
+    @property
+    def lineage(self) -> str:
+        return " > ".join(f"{name} {version}" for name, version in self.versions.items())
+
 
 @dataclass(kw_only=True)
 class PlaybookRequest:
     playbook: str
     cli: cli.Cli
     system_info: Dict[str, Any] = field(default_factory=dict)
+    normalized: Optional[sysinfo.Normalized] = field(default=None, repr=False)
     timestamp: float = field(default_factory=time.time)
 
     @property
@@ -67,6 +80,19 @@ class PlaybookRequest:
         return ""
 
 
+def index_system_info(share: Share, system_info: sysinfo.Normalized) -> None:
+    known = share.unique_system_information_index
+    for item in system_info.items:
+        if item not in known:
+            known.add(item)
+            share.unique_system_information.append(item)
+    known = share.unique_system_paths_index
+    for path in system_info.paths:
+        if path not in known:
+            known.add(path)
+            share.unique_system_paths.append(path)
+
+
 class SelectionConfirm:
     def __init__(self, container, label) -> None:
         self._container = container
@@ -113,9 +139,12 @@ class Answer(Tab):
                 with ui.dialog() as dialog, el.Card():
                     with el.DBody(height="[90vh]", width="[90vw]"):
                         with el.WColumn():
+                            explain = e.args["data"].get("explain")
                             with ui.tabs().classes("w-full") as tabs:
                                 system_info_tab = ui.tab("System Info")
                                 response_tab = ui.tab("Response")
+                                if explain is not None:
+                                    explain_tab = ui.tab("Explain")
                             with ui.tab_panels(tabs, value=system_info_tab):
                                 with ui.tab_panel(system_info_tab):
                                     system_info = e.args["data"]["system_info"]
@@ -133,6 +162,10 @@ class Answer(Tab):
 
                                     response = "\n".join(response_lines)
                                     ui.code(response).classes("w-[70vw] h-[70vh]")
+                                if explain is not None:
+                                    with ui.tab_panel(explain_tab):
+                                        properties = {"content": {"json": explain}, "readOnly": True}
+                                        el.JsonEditor(properties=properties).classes("w-[70vw] h-[70vh]")
 
                         with el.WRow() as row:
                             row.classes("h-[40px]")
@@ -146,6 +179,10 @@ class Answer(Tab):
             with ui.row() as row:
                 row.classes("justify-between w-full").bind_visibility_from(self._confirm, "visible", value=False)
                 el.SmButton(text="Remove", on_click=self._remove_history)
+                with ui.column().classes("gap-0 items-center"):
+                    ui.label().classes("text-secondary").bind_text_from(admission.answer, "status")
+                    ui.label().classes("text-secondary").bind_text_from(workers.answer, "status")
+                    ui.label().classes("text-secondary").bind_text_from(workers.loop, "status")
                 el.SmButton(text="Refresh", on_click=lambda _: self.update())
             self.grid = ui.aggrid(
                 {
@@ -192,6 +229,23 @@ class Answer(Tab):
                             "filter": "agTextColumnFilter",
                             "maxWidth": 200,
                         },
+                        {
+                            "headerName": "Version",
+                            "field": "version",
+                            "filter": "agNumberColumnFilter",
+                            "maxWidth": 90,
+                        },
+                        {
+                            "headerName": "Lineage",
+                            "field": "lineage",
+                            "filter": "agTextColumnFilter",
+                        },
+                        {
+                            "headerName": "Hits",
+                            "field": "hits",
+                            "filter": "agNumberColumnFilter",
+                            "maxWidth": 80,
+                        },
                     ],
                     "rowData": [],
                 },
@@ -231,22 +285,32 @@ class Answer(Tab):
 
     @classmethod
     def add_history(cls, request: AnswerRequest) -> None:
-        if len(cls._share.answer_history) > 1000:
-            cls._share.answer_history.pop(0)
-        cls._share.answer_history.append(
-            {
-                "timestamp": request.timestamp,
-                "name": request.name,
-                "answer": request.answer,
-                "response": request.response,
-                "system_info": request.system_info,
-            }
-        )
-        cls._share.last_timestamp = request.timestamp
-        matches = re.findall(r"(\"[^\"]+\"\s*:\s*(\"[^\"]+\"|\d+|true|false))", json.dumps(request.system_info))
-        for match in matches:
-            if str(match[0]) not in cls._share.unique_system_information:
-                cls._share.unique_system_information.append(str(match[0]))
+        share = cls.share(request.site)
+        if len(share.answer_history) > 1000:
+            share.answer_history.pop(0)
+        row = {
+            "timestamp": request.timestamp,
+            "name": request.name,
+            "answer": request.answer,
+            "version": request.version,
+            "versions": request.versions,
+            "lineage": request.lineage,
+            "hits": 1,
+            "response": request.response,
+            "system_info": request.system_info,
+            "explain": request.explain,
+        }
+        share.answer_history.append(row)
+        share.last_timestamp = request.timestamp
+        index_system_info(share, request.normalized or sysinfo.normalize(request.system_info))
+
+    @classmethod
+    def add_hit(cls, repeat: idempotency.Entry) -> None:
+        # The repeat is counted on the row of the request it repeats, as long as that is still in the history.
+        for row in reversed(cls.share(repeat.site).answer_history):
+            if row["timestamp"] == repeat.timestamp and row["name"] == repeat.name and row["answer"] == repeat.answer and row["versions"] == repeat.versions:
+                row["hits"] += 1
+                return
 
     async def _remove_history(self):
         self._set_selection(mode="multiple")
@@ -299,6 +363,7 @@ class Playbook(Tab):
             with ui.row() as row:
                 row.classes("justify-between w-full").bind_visibility_from(self._confirm, "visible", value=False)
                 el.SmButton(text="Remove", on_click=self._remove_history)
+                ui.label().classes("text-secondary").bind_text_from(admission.playbook, "status")
                 el.SmButton(text="Refresh", on_click=lambda _: self.update())
             self.grid = ui.aggrid(
                 {
@@ -403,10 +468,7 @@ class Playbook(Tab):
             }
         )
         cls._share.last_timestamp = request.timestamp
-        matches = re.findall(r"(\"[^\"]+\"\s*:\s*(\"[^\"]+\"|\d+|true|false))", json.dumps(request.system_info))
-        for match in matches:
-            if str(match[0]) not in cls._share.unique_system_information:
-                cls._share.unique_system_information.append(str(match[0]))
+        index_system_info(cls._share, request.normalized or sysinfo.normalize(request.system_info))
 
     async def _remove_history(self):
         self._set_selection(mode="multiple")
@@ -0,0 +1,85 @@
+from typing import Optional
+from nicegui import ui
+from nicegui.events import UploadEventArguments
+from . import Tab
+from autopve import elements as el
+from autopve import mappings, storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Mapping(Tab):
+    def _build(self):
+        async def handle_upload(e: UploadEventArguments):
+            count, skipped = mappings.import_csv(await e.file.text())
+            upload.reset()
+            self.update()
+            el.Notification(f"Imported {count} mappings from {e.file.name}.", type="positive", timeout=5)
+            if len(skipped) > 0:
+                el.Notification(f"Skipped {len(skipped)} rows without a known answer:\n" + "\n".join(skipped[:10]), type="warning", multi_line=True)
+
+        with el.WColumn() as col:
+            col.classes("h-full")
+            with ui.row() as row:
+                row.classes("w-full items-center justify-between")
+                identifier = el.FInput(label="MAC or serial")
+                answer = el.FSelect(storage.answer_names(), label="answer", value="Default")
+                ui.button(icon="add", on_click=lambda: self._add_mapping(identifier.value, answer.value)).tooltip("Add Mapping")
+            with ui.row() as row:
+                row.classes("justify-between w-full")
+                upload = ui.upload(on_upload=handle_upload, auto_upload=True).props("accept=.csv")
+                upload.classes("hidden")
+                el.SmButton(text="Import", on_click=lambda: upload.run_method("pickFiles"))
+                el.SmButton(text="Export", on_click=lambda: ui.download.content(mappings.export_csv(), "mappings.csv", "text/csv"))
+                el.SmButton(text="Remove", on_click=self._remove_mappings)
+            self.grid = ui.aggrid(
+                {
+                    "rowSelection": {
+                        "mode": "multiRow",
+                        "enableClickSelection": True,
+                        "checkboxes": True,
+                    },
+                    "paginationAutoPageSize": True,
+                    "pagination": True,
+                    "defaultColDef": {
+                        "resizable": True,
+                        "sortable": True,
+                        "suppressMovable": True,
+                        "sortingOrder": ["asc", "desc"],
+                    },
+                    "columnDefs": [
+                        {
+                            "headerName": "Identifier",
+                            "field": "identifier",
+                            "filter": "agTextColumnFilter",
+                            "sort": "asc",
+                        },
+                        {
+                            "headerName": "Answer",
+                            "field": "answer",
+                            "filter": "agTextColumnFilter",
+                        },
+                    ],
+                    "rowData": [],
+                },
+                theme="balham",
+            )
+            self.grid.classes("w-full h-5/6")
+            self.update()
+
+    def update(self):
+        self.grid.options["rowData"] = [{"identifier": identifier, "answer": answer} for identifier, answer in storage.mappings.items()]
+        self.grid.update()
+
+    def _add_mapping(self, identifier: Optional[str], answer: Optional[str]):
+        if identifier is None or identifier.strip() == "" or answer not in storage.answer_names():
+            return
+        storage.mappings[mappings.normalize(identifier)] = answer
+        self.update()
+
+    async def _remove_mappings(self):
+        rows = await self.grid.get_selected_rows()
+        for row in rows:
+            storage.mappings.pop(row["identifier"], None)
+        self.update()
@@ -9,9 +9,9 @@ logger = logging.getLogger(__name__)
 
 
 class Setting(Tab):
-    def __init__(self, answer: str, type: Optional[str] = None, keys: Dict[str, Dict[str, Any]] = {}) -> None:
+    def __init__(self, answer: str, type: Optional[str] = None, keys: Dict[str, Dict[str, Any]] = {}, site: str = storage.default_site) -> None:
         self.keys: Dict[str, Dict[str, Any]] = keys
-        super().__init__(answer, type=type)
+        super().__init__(answer, type=type, site=site)
 
     def _build(self):
         self.keys_controls()
@@ -54,7 +54,7 @@ class Setting(Tab):
             ui.separator()
             self._scroll = ui.scroll_area()
             self._scroll.classes("w-full h-[480px]")
-        items = storage.answer(self.answer)
+        items = storage.answer(self.answer, site=self.site)
         if self.type is not None and self.type in items:
             for key, value in items[self.type].items():
                 if isinstance(value, list):
@@ -127,8 +127,8 @@ class Setting(Tab):
     def remove_key(self, key: str):
         self._scroll.remove(self._elements[key]["row"])
         del self._elements[key]
-        if key in storage.answer(self.answer)[self.type]:
-            del storage.answer(self.answer)[self.type][key]
+        if key in storage.answer(self.answer, site=self.site)[self.type]:
+            del storage.answer(self.answer, site=self.site)[self.type][key]
 
     def set_key(self, key: str, value: str):
         v: Any = ""
@@ -149,9 +149,9 @@ class Setting(Tab):
                     v = int(value)
                 else:
                     v = value
-        if self.type not in storage.answer(self.answer):
-            storage.answer(self.answer)[self.type] = {}
-        storage.answer(self.answer)[self.type][key] = v
+        if self.type not in storage.answer(self.answer, site=self.site):
+            storage.answer(self.answer, site=self.site)[self.type] = {}
+        storage.answer(self.answer, site=self.site)[self.type][key] = v
 
     def key_changed(self, value: str):
         if self.help is not None:
@@ -162,7 +162,7 @@ class Setting(Tab):
 
 
 class Global(Setting):
-    def __init__(self, answer: str) -> None:
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
         keys = {
             "keyboard": {
                 "description": "The keyboard layout with the following possible options",
@@ -216,11 +216,11 @@ class Global(Setting):
                 "description": "Optional. Specifies whether the target machine should be rebooted or powered off after a successful installation. Options are reboot (default) and power-off."
             },
         }
-        super().__init__(answer, type="global", keys=keys)
+        super().__init__(answer, type="global", keys=keys, site=site)
 
 
 class Network(Setting):
-    def __init__(self, answer: str) -> None:
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
         keys = {
             "source": {"description": "Where to source the static network configuration from. This can be from-dhcp or from-answer.", "options": ["from-dhcp", "from-answer"]},
             "cidr": {"description": "The IP address in CIDR notation. For example, 192.168.1.10/24."},
@@ -228,11 +228,11 @@ class Network(Setting):
             "gateway": {"description": "The IP address of the default gateway."},
             "filter.ID_NET_NAME_MAC": {"description": "Filter against the ID_NET_NAME_MAC property to select the network card. See filters."},
         }
-        super().__init__(answer, type="network", keys=keys)
+        super().__init__(answer, type="network", keys=keys, site=site)
 
 
 class Disk(Setting):
-    def __init__(self, answer: str) -> None:
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
         keys = {
             "filesystem": {"description": "One of the following options: ext4, xfs, zfs, or btrfs.", "options": ["ext4", "xfs", "zfs", "btrfs"]},
             "disk-list": {"description": 'List of disks to use. Useful if you are sure about the disk names. For example: disk_list = ["sda", "sdb"].'},
@@ -284,7 +284,7 @@ class Disk(Setting):
                 "options": ["on", "off", "zlib", "lzo", "zstd"],
             },
         }
-        super().__init__(answer, type="disk-setup", keys=keys)
+        super().__init__(answer, type="disk-setup", keys=keys, site=site)
 
     def key_valid(self, key: str) -> bool:
         if super().key_valid(key) is True:
@@ -299,16 +299,16 @@ class Disk(Setting):
 
 
 class PostInstallWebhook(Setting):
-    def __init__(self, answer: str) -> None:
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
         keys = {
             "url": {"description": "The URL the information about the installed system should be sent to as HTTP POST request."},
             "cert-fingerprint": {"description": "Optional. SHA256 certificate fingerprint if certificate pinning should be used."},
         }
-        super().__init__(answer, type="post-installation-webhook", keys=keys)
+        super().__init__(answer, type="post-installation-webhook", keys=keys, site=site)
 
 
 class FirstBootHook(Setting):
-    def __init__(self, answer: str) -> None:
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
         keys = {
             "source": {
                 "description": "Where to source the executable for running at first boot from. It can either be from-iso or from-url.",
@@ -321,28 +321,28 @@ class FirstBootHook(Setting):
             "url": {"description": 'Required when source = "from-url". The URL of the executable file to download.'},
             "cert-fingerprint": {"description": "Optional. SHA256 certificate fingerprint if certificate pinning should be used for the download of the executable file."},
         }
-        super().__init__(answer, type="first-boot", keys=keys)
+        super().__init__(answer, type="first-boot", keys=keys, site=site)
 
 
 class NetworkInterfacePinning(Setting):
-    def __init__(self, answer: str) -> None:
-        super().__init__(answer, type="network.interface-name-pinning.mapping")
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
+        super().__init__(answer, type="network.interface-name-pinning.mapping", site=site)
 
     def keys_controls(self):
         def control_pinning(enabled: bool):
             if enabled is True:
-                if "network.interface-name-pinning" not in storage.answer(self.answer):
-                    storage.answer(self.answer)["network.interface-name-pinning"] = {}
-                storage.answer(self.answer)["network.interface-name-pinning"]["enabled"] = True
+                if "network.interface-name-pinning" not in storage.answer(self.answer, site=self.site):
+                    storage.answer(self.answer, site=self.site)["network.interface-name-pinning"] = {}
+                storage.answer(self.answer, site=self.site)["network.interface-name-pinning"]["enabled"] = True
             else:
-                if "network.interface-name-pinning" in storage.answer(self.answer):
-                    del storage.answer(self.answer)["network.interface-name-pinning"]
+                if "network.interface-name-pinning" in storage.answer(self.answer, site=self.site):
+                    del storage.answer(self.answer, site=self.site)["network.interface-name-pinning"]
 
         with ui.column() as col:
             col.classes("w-[560px] items-center")
             with ui.card() as card:
                 card.classes("w-full")
-                ui.checkbox(text="Enable", value="network.interface-name-pinning" in storage.answer(self.answer), on_change=lambda e: control_pinning(e.value))
+                ui.checkbox(text="Enable", value="network.interface-name-pinning" in storage.answer(self.answer, site=self.site), on_change=lambda e: control_pinning(e.value))
                 with ui.row() as row:
                     row.classes("w-full items-center justify-between")
                     with ui.row() as row:
@@ -353,7 +353,7 @@ class NetworkInterfacePinning(Setting):
             ui.separator()
             self._scroll = ui.scroll_area()
             self._scroll.classes("w-full h-[480px]")
-        items = storage.answer(self.answer)
+        items = storage.answer(self.answer, site=self.site)
         if self.type is not None and self.type in items:
             for key, value in items[self.type].items():
                 if isinstance(value, list):
@@ -2,7 +2,7 @@ from typing import Optional
 from nicegui import ui
 from . import Tab
 from autopve import elements as el
-from autopve import storage
+from autopve import matcher, patterns, rules, storage
 from autopve.interfaces import ssh
 import logging
 
@@ -10,11 +10,13 @@ logger = logging.getLogger(__name__)
 
 
 class System(Tab):
-    def __init__(self, answer: str, type: Optional[str] = None, note: str = "") -> None:
+    def __init__(self, answer: str, type: Optional[str] = None, note: str = "", field_rules: bool = True, site: str = storage.default_site) -> None:
         self.note: str = note
+        self.field_rules: bool = field_rules
         self.select: Optional[ui.select] = None
+        self.path_select: Optional[ui.select] = None
         self.last_update_timestamp: float = 0
-        super().__init__(answer, type=type)
+        super().__init__(answer, type=type, site=site)
 
     def _build(self):
         self.restriction_picker()
@@ -34,19 +36,32 @@ class System(Tab):
                         restriction.classes("w-[420px]")
                         restriction.bind_value_from(self.select)
                         ui.button(icon="add", on_click=lambda restriction=restriction: add_restriction(restriction.value))
+                    if self.field_rules:
+                        ui.separator()
+                        self.path_select = ui.select(self._share.unique_system_paths, label="path", new_value_mode="add", with_input=True)
+                        self.path_select.classes("w-full")
+                        with ui.row() as row:
+                            row.classes("w-full items-center justify-between")
+                            value = el.FInput(label="value")
+                            value.classes("w-[420px]")
+                            ui.button(icon="add", on_click=lambda value=value: add_rule(self.path_select.value, value.value))
                     ui.label(self.note).classes("self-center")
 
                 ui.separator()
                 self.scroll = ui.scroll_area()
                 self.scroll.classes("w-full h-[480px]")
             restrictions = []
-            if self.type in storage.answer(self.answer):
-                restrictions = storage.answer(self.answer)[self.type]
+            if self.type in storage.answer(self.answer, site=self.site):
+                restrictions = storage.answer(self.answer, site=self.site)[self.type]
             for restriction in restrictions:
                 add_restriction(restriction)
 
         def add_restriction(restriction: str):
             if restriction is not None and restriction.strip() != "" and restriction not in self._elements.keys():
+                error = self.check(restriction)
+                if error is not None:
+                    el.Notification(error, type="negative", timeout=5)
+                    return
                 with self.scroll:
                     with ui.row() as row:
                         row.classes("w-full items-center justify-between")
@@ -56,33 +71,116 @@ class System(Tab):
                         }
                         self._elements[restriction]["control"].classes("w-[420px]")
                         ui.button(icon="remove", on_click=lambda _, r=restriction: remove_restriction(r))
-                if self.type not in storage.answer(self.answer):
-                    storage.answer(self.answer)[self.type] = []
-                if restriction not in storage.answer(self.answer)[self.type]:
-                    storage.answer(self.answer)[self.type].append(restriction)
+                if self.type not in storage.answer(self.answer, site=self.site):
+                    storage.answer(self.answer, site=self.site)[self.type] = []
+                if restriction not in storage.answer(self.answer, site=self.site)[self.type]:
+                    storage.answer(self.answer, site=self.site)[self.type].append(restriction)
+
+        def add_rule(path: Optional[str], value: str):
+            if path is None or path.strip() == "":
+                return
+            rule = f"{path.strip()} == {value.strip()}"
+            if matcher.parse_rule(rule) is None:
+                el.Notification(f"'{path}' is not a valid field path!", type="negative", timeout=5)
+                return
+            add_restriction(rule)
 
         def remove_restriction(restriction):
             self.scroll.remove(self._elements[restriction]["row"])
             del self._elements[restriction]
-            if restriction in storage.answer(self.answer)[self.type]:
-                storage.answer(self.answer)[self.type].remove(restriction)
+            if restriction in storage.answer(self.answer, site=self.site)[self.type]:
+                storage.answer(self.answer, site=self.site)[self.type].remove(restriction)
 
         restriction_controls()
 
+    def check(self, restriction: str) -> Optional[str]:
+        return None
+
     def update(self):
         if self.select is not None and self._share.last_timestamp > self.last_update_timestamp:
             self.last_update_timestamp = self._share.last_timestamp
             self.select.update()
+            if self.path_select is not None:
+                self.path_select.update()
 
 
 class MustContain(System):
-    def __init__(self, answer: str) -> None:
-        super().__init__(answer, type="must_contain", note="The system information must contain at least one of these strings.")
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
+        super().__init__(answer, type="must_contain", note="The system information must contain at least one of these strings or satisfy one of these field rules.", site=site)
 
 
 class MustNotContain(System):
-    def __init__(self, answer: str) -> None:
-        super().__init__(answer, type="must_not_contain", note="The system information must not contain any of these strings.")
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
+        super().__init__(answer, type="must_not_contain", note="The system information must not contain any of these strings or satisfy any of these field rules.", site=site)
+
+
+class Expression(Tab):
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
+        self.status: Optional[ui.label] = None
+        super().__init__(answer, type="rule", site=site)
+
+    def _build(self):
+        with ui.column() as col:
+            col.classes("w-[560px] items-center")
+            with ui.card() as card:
+                card.classes("w-full")
+                value = storage.answer(self.answer, site=self.site).get(self.type, "")
+                editor = ui.textarea(label="rule", value=value, on_change=lambda e: self.set_rule(e.value))
+                editor.classes("w-full").props("outlined autogrow")
+                self.status = ui.label().classes("self-center")
+                ui.label(
+                    'Combine conditions with AND, OR, NOT and parentheses. Conditions are "text" found anywhere in the system information, '
+                    'path == value, path != value, path contains "text", path > number (also >=, <, <=) and count(path [condition]) >= number. '
+                    'For example: dmi.system.manufacturer == "Dell Inc." AND count(disks[*].name contains "nvme") >= 4 AND NOT dmi.system.serial == X. '
+                    "When set, the rule must hold in addition to the other filters."
+                ).classes("self-center")
+        self.set_rule(value, save=False)
+
+    def set_rule(self, value: str, save: bool = True):
+        value = value if value is not None else ""
+        error = rules.check(value) if value.strip() != "" else None
+        if self.status is not None:
+            self.status.text = error if error is not None else ("Rule compiled." if value.strip() != "" else "No rule set.")
+            self.status.classes(replace="self-center text-negative" if error is not None else "self-center")
+        if save is False or error is not None:
+            return
+        answer = storage.answer(self.answer, site=self.site)
+        if value.strip() == "":
+            answer.pop(self.type, None)
+        elif answer.get(self.type) != value:
+            answer[self.type] = value
+
+
+class Regex(System):
+    def __init__(self, answer: str, type: str, note: str, site: str = storage.default_site) -> None:
+        super().__init__(answer, type=type, note=note, field_rules=False, site=site)
+
+    def check(self, restriction: str) -> Optional[str]:
+        return patterns.check(restriction)
+
+    def _build(self):
+        super()._build()
+        self.update()
+
+    def update(self):
+        super().update()
+        for restriction, element in self._elements.items():
+            if "stats" not in element:
+                with element["control"]:
+                    element["stats"] = ui.tooltip("")
+            element["stats"].text = patterns.compiled(restriction).stats
+
+
+class MustMatch(Regex):
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
+        note = "The system information must match at least one of these regular expressions, written as a pattern or as 'path ~ pattern' to match field values. Backreferences, lookarounds and repeats that can match the same text in more than one way are not allowed."
+        super().__init__(answer, type="must_match", note=note, site=site)
+
+
+class MustNotMatch(Regex):
+    def __init__(self, answer: str, site: str = storage.default_site) -> None:
+        note = "The system information must not match any of these regular expressions, written as a pattern or as 'path ~ pattern' to match field values. Backreferences, lookarounds and repeats that can match the same text in more than one way are not allowed."
+        super().__init__(answer, type="must_not_match", note=note, site=site)
 
 
 class SSHKey:
@@ -0,0 +1,115 @@
+from typing import Any, Awaitable, Callable, Optional
+from nicegui import ui
+from . import Tab
+from autopve import elements as el
+from autopve import delta, storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Versions(Tab):
+    def __init__(self, answer: str, site: str = storage.default_site, on_rollback: Optional[Callable[[], Awaitable[Any]]] = None) -> None:
+        self._on_rollback = on_rollback
+        self.status: str = ""
+        super().__init__(answer, site=site)
+
+    def _build(self):
+        async def display_version(e):
+            version = e.args["data"]["version"]
+            before = storage.revision(self.answer, version - 1, site=self.site) if version > 1 else None
+            after = storage.revision(self.answer, version, site=self.site)
+            live = storage.answer(self.answer, copy=True, site=self.site)
+            with ui.dialog() as dialog, el.Card():
+                with el.DBody(height="[90vh]", width="[90vw]"):
+                    with el.WColumn():
+                        with ui.tabs().classes("w-full") as tabs:
+                            changes_tab = ui.tab("Changes")
+                            live_tab = ui.tab("Against Live")
+                        with ui.tab_panels(tabs, value=changes_tab):
+                            with ui.tab_panel(changes_tab):
+                                changes = delta.lines(before, after, f"version {version - 1}", f"version {version}")
+                                ui.code(changes or "No changes.", language="diff").classes("w-[70vw] h-[70vh]")
+                            with ui.tab_panel(live_tab):
+                                changes = delta.lines(after, live, f"version {version}", "live")
+                                ui.code(changes or "Same as live.", language="diff").classes("w-[70vw] h-[70vh]")
+                    with el.WRow() as row:
+                        row.classes("h-[40px]")
+                        if after is not None:
+                            el.DButton("Rollback", on_click=lambda: dialog.submit("rollback"))
+                        el.DButton("Exit", on_click=lambda: dialog.submit("exit"))
+            if await dialog == "rollback":
+                await self._rollback(version)
+
+        with el.WColumn() as col:
+            col.classes("h-full")
+            with ui.row() as row:
+                row.classes("justify-between w-full")
+                ui.label().classes("text-secondary").bind_text_from(self, "status")
+                el.SmButton(text="Refresh", on_click=lambda _: self.update())
+            self.grid = ui.aggrid(
+                {
+                    "paginationAutoPageSize": True,
+                    "pagination": True,
+                    "defaultColDef": {
+                        "resizable": True,
+                        "sortable": True,
+                        "suppressMovable": True,
+                        "sortingOrder": ["asc", "desc"],
+                    },
+                    "columnDefs": [
+                        {
+                            "headerName": "Version",
+                            "field": "version",
+                            "filter": "agNumberColumnFilter",
+                            "maxWidth": 100,
+                            "sort": "desc",
+                        },
+                        {
+                            "headerName": "Timestamp",
+                            "field": "created",
+                            "filter": "agTextColumnFilter",
+                            ":cellRenderer": """(data) => {
+                                var date = new Date(data.value * 1000).toLocaleString(undefined, {dateStyle: 'short', timeStyle: 'medium', hour12: false});;
+                                return date;
+                            }""",
+                        },
+                        {
+                            "headerName": "Stored As",
+                            "field": "kind",
+                            "filter": "agTextColumnFilter",
+                            "maxWidth": 120,
+                        },
+                        {
+                            "headerName": "Bytes",
+                            "field": "size",
+                            "filter": "agNumberColumnFilter",
+                            "maxWidth": 100,
+                        },
+                    ],
+                    "rowData": [],
+                },
+                theme="balham",
+            )
+            self.grid.classes("w-full h-5/6")
+            self.grid.on("cellClicked", lambda e: display_version(e))
+            self.update()
+
+    def update(self):
+        revisions = storage.revisions(self.answer, site=self.site)
+        self.grid.options["rowData"] = [{"version": r.version, "created": r.created, "kind": r.kind, "size": r.size} for r in revisions]
+        self.grid.update()
+        current = revisions[0].version if len(revisions) > 0 else 0
+        self.status = f"Live version {current} | {len(revisions)} versions in {sum(r.size for r in revisions)} bytes"
+
+    async def _rollback(self, version: int):
+        try:
+            current = storage.rollback(self.answer, version, site=self.site)
+        except ValueError as e:
+            el.Notification(str(e), type="negative", timeout=5)
+            return
+        el.Notification(f"Rolled '{self.answer}' back to version {version}, live as version {current}.", type="positive", timeout=5)
+        if self._on_rollback is not None:
+            await self._on_rollback()
+        else:
+            self.update()
@@ -0,0 +1,120 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import functools
+import json
+import re
+from autopve import storage, sysinfo
+import logging
+
+logger = logging.getLogger(__name__)
+
+field_pattern = re.compile(r"\{\{(.*?)\}\}", re.DOTALL)
+filter_pattern = re.compile(r"""\|\s*(\w+)\s*(?:\(((?:"(?:[^"\\]|\\.)*"|[^()"])*)\))?\s*""")
+
+filters: Dict[str, Callable[..., str]] = {
+    "lower": lambda value: value.lower(),
+    "upper": lambda value: value.upper(),
+    "strip": lambda value: value.strip(),
+    "default": lambda value, fallback: value if value != "" else str(fallback),
+    "replace": lambda value, old, new: value.replace(str(old), str(new)),
+    "slice": lambda value, start, end=None: value[start:end],
+}
+
+
+@dataclass(frozen=True)
+class Field:
+    source: str
+    segments: Tuple[Union[str, int], ...]
+    filters: Tuple[Tuple[Callable[..., str], Tuple[Any, ...]], ...]
+
+    def render(self, system_info: sysinfo.Normalized) -> str:
+        found = system_info.values(self.segments)
+        value = sysinfo.text(found[0]) if len(found) > 0 and found[0] is not None else ""
+        for function, args in self.filters:
+            value = function(value, *args)
+        return value
+
+
+@dataclass(frozen=True)
+class Template:
+    source: str
+    parts: Tuple[Union[str, Field], ...]
+
+    def render(self, system_info: sysinfo.Normalized) -> str:
+        return "".join(part if isinstance(part, str) else part.render(system_info) for part in self.parts)
+
+
+def parse_field(expression: str) -> Field:
+    expression = expression.strip()
+    path, _, chain = expression.partition("|")
+    segments = sysinfo.parse_path(path.strip())
+    if segments is None:
+        raise ValueError(f"Invalid system info path '{path.strip()}' in '{{{{{expression}}}}}'.")
+    compiled = []
+    if chain:
+        chain = "|" + chain
+        position = 0
+        while position < len(chain):
+            match = filter_pattern.match(chain, position)
+            if match is None:
+                raise ValueError(f"Invalid filter '{chain[position:].strip()}' in '{{{{{expression}}}}}'.")
+            name, args = match.group(1), match.group(2)
+            if name not in filters:
+                raise ValueError(f"Unknown filter '{name}' in '{{{{{expression}}}}}'.")
+            try:
+                arguments = tuple(json.loads(f"[{args}]")) if args else tuple()
+                filters[name]("", *arguments)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Invalid arguments for filter '{name}' in '{{{{{expression}}}}}': {e}")
+            compiled.append((filters[name], arguments))
+            position = match.end()
+    return Field(source=expression, segments=segments, filters=tuple(compiled))
+
+
+@functools.lru_cache(maxsize=4096)
+def parse(text: str) -> Optional[Template]:
+    if "{{" not in text:
+        return None
+    parts: List[Union[str, Field]] = []
+    position = 0
+    for match in field_pattern.finditer(text):
+        if match.start() > position:
+            parts.append(text[position : match.start()])
+        parts.append(parse_field(match.group(1)))
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+    if not any(isinstance(part, Field) for part in parts):
+        return None
+    return Template(source=text, parts=tuple(parts))
+
+
+def parsed(text: str) -> Optional[Template]:
+    try:
+        return parse(text)
+    except ValueError as e:
+        logger.warning(f"{e} The value is served as written.")
+        return None
+
+
+def strings(data: Any) -> List[str]:
+    if isinstance(data, str):
+        return [data]
+    if isinstance(data, dict):
+        return [text for value in data.values() for text in strings(value)]
+    if isinstance(data, list):
+        return [text for value in data for text in strings(value)]
+    return []
+
+
+def _precompile(site: str, name: Optional[str]) -> None:
+    answers = storage.answer_set(site)
+    for answer in answers.keys() if name is None else [name]:
+        for text in strings(answers.get(answer, {})):
+            try:
+                parse(text)
+            except ValueError as e:
+                logger.debug(f"Answer '{answer}': {e}")
+
+
+storage.on_answer_change(_precompile)
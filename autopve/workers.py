@@ -0,0 +1,103 @@
+from typing import Any, Callable, Deque, Optional, TypeVar
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import os
+import time
+from nicegui import app
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Pool:
+    def __init__(self, name: str, size: int) -> None:
+        self.name: str = name
+        self.size: int = size
+        self.active: int = 0
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._times: Deque[float] = collections.deque(maxlen=1000)
+
+    @property
+    def busy(self) -> float:
+        return sum(self._times) / len(self._times) if self._times else 0.0
+
+    @property
+    def status(self) -> str:
+        where = f"{self.active}/{self.size} workers busy" if self.size > 0 else "on the event loop"
+        return f"Resolving {where} | Average {self.busy * 1000:.2f} ms"
+
+    def _timed(self, function: Callable[..., T], *args: Any) -> T:
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._times.append(time.perf_counter() - start)
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        if self.size <= 0:
+            return self._timed(function, *args)
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f"autopve-{self.name}")
+        self.active += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(self._timed, function, *args))
+        finally:
+            self.active -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class Monitor:
+    # Measures how late a periodic wakeup fires, which is how long the event loop was blocked by other work.
+    def __init__(self, interval: float) -> None:
+        self.interval: float = interval
+        self._lags: Deque[float] = collections.deque(maxlen=int(60 / interval))
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def mean(self) -> float:
+        return sum(self._lags) / len(self._lags) if self._lags else 0.0
+
+    @property
+    def max(self) -> float:
+        return max(self._lags) if self._lags else 0.0
+
+    @property
+    def status(self) -> str:
+        return f"Event loop lag {self.mean * 1000:.1f} ms average, {self.max * 1000:.1f} ms max over the last minute"
+
+    def reset(self) -> None:
+        self._lags.clear()
+
+    async def _watch(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch(), name="autopve loop monitor")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+answer = Pool("answer", int(os.environ.get("AUTOPVE_ANSWER_WORKERS", "1")))
+# Dry runs get their own threads, a large batch never holds up the answer workers.
+batch = Pool("batch", int(os.environ.get("AUTOPVE_BATCH_WORKERS", "1")))
+loop = Monitor(0.1)
+
+app.on_startup(loop.start)
+app.on_shutdown(loop.stop)
+app.on_shutdown(answer.shutdown)
+app.on_shutdown(batch.shutdown)
@@ -0,0 +1,96 @@
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+import asyncio
+import os
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+delay = float(os.environ.get("AUTOPVE_WRITE_DELAY", "1"))
+
+
+class Batch(Generic[K, V]):
+    # Collects changes per key and writes the latest value of each once the window after the first change has passed.
+    def __init__(self, name: str, write: Callable[[Dict[K, V]], None], delay: float = delay) -> None:
+        self.name: str = name
+        self.delay: float = delay
+        self.changes: int = 0
+        self.writes: int = 0
+        self._write: Callable[[Dict[K, V]], None] = write
+        self._pending: Dict[K, V] = {}
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def status(self) -> str:
+        return f"{self.name}: {self.changes} changes saved in {self.writes} writes, {len(self._pending)} pending"
+
+    def put(self, key: K, value: V) -> None:
+        self.changes += 1
+        self._pending[key] = value
+        if self._handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or self.delay <= 0:
+            self.flush()
+        else:
+            self._handle = loop.call_later(self.delay, self.flush)
+
+    def get(self, key: K) -> Optional[V]:
+        return self._pending.get(key)
+
+    def pending(self, key: K) -> bool:
+        return key in self._pending
+
+    def discard(self, predicate: Callable[[K], bool]) -> None:
+        for key in [key for key in self._pending if predicate(key)]:
+            del self._pending[key]
+
+    def flush(self, predicate: Optional[Callable[[K], bool]] = None) -> None:
+        if predicate is None:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+            items, self._pending = self._pending, {}
+        else:
+            items = {key: value for key, value in self._pending.items() if predicate(key)}
+            for key in items:
+                del self._pending[key]
+        if not items:
+            return
+        try:
+            self._write(items)
+            self.writes += 1
+            logger.debug(f"Wrote {len(items)} changed entries, {self.status}.")
+        except Exception:
+            logger.exception(f"Saving {len(items)} pending {self.name} changes failed, they are retried with the next save.")
+            # Changes made while writing are newer than the failed ones and win.
+            self._pending = {**items, **self._pending}
+
+
+def atomic_write(path: str, data: str) -> None:
+    # Readers see either the old or the new file, never a partially written one.
+    directory = os.path.dirname(path) or "."
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(temporary, os.stat(path).st_mode & 0o777)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def write_files(files: Dict[str, Any]) -> None:
+    for path, data in files.items():
+        atomic_write(path, data)
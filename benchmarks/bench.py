@@ -0,0 +1,139 @@
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+benchmarks_path = os.path.dirname(os.path.abspath(__file__))
+root_path = os.path.dirname(benchmarks_path)
+baselines_path = os.path.join(benchmarks_path, "baselines")
+sys.path.insert(0, root_path)
+sys.path.insert(0, benchmarks_path)
+
+import generate  # noqa: E402
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def drive(client, path: str, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(payload: Dict[str, Any]) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(payload) for payload in payloads))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def measure(client, path: str, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    from autopve import workers
+
+    workers.loop.reset()
+    result = await drive(client, path, payloads, concurrency)
+    result["lag_mean_ms"] = workers.loop.mean * 1000
+    result["lag_max_ms"] = workers.loop.max * 1000
+    return result
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    # Payloads are drawn with replacement, repeats would be served from the idempotency window and are measured on their own.
+    os.environ["AUTOPVE_IDEMPOTENCY_WINDOW"] = "0"
+    import httpx
+    import main  # noqa: F401
+    from nicegui import app
+    from nicegui.testing.general import prepare_simulation
+    from autopve import idempotency, storage
+
+    rnd = random.Random(args.seed)
+    machines = [generate.system_info(rnd, index, disks=args.disks, nics=args.nics) for index in range(args.machines)]
+    storage.answers.update(generate.answers(rnd, machines, count=args.answers, filters=args.filters, rules=args.rules))
+    storage.mk_playbook("bench")
+    payloads = [rnd.choice(machines) for _ in range(args.requests)]
+    size = sum(len(json.dumps(payload)) for payload in payloads) / len(payloads)
+    print(f"{args.answers} answers with {args.filters} filters each, {args.machines} machines, average payload {size:.0f} bytes")
+
+    results: Dict[str, Dict[str, float]] = {}
+    prepare_simulation()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://bench") as client:
+            for endpoint in args.endpoints:
+                path = "/answer" if endpoint == "answer" else "/playbook/bench"
+                await drive(client, path, payloads[: args.warmup], args.concurrency)
+                results[endpoint] = await measure(client, path, payloads, args.concurrency)
+                if endpoint == "answer":
+                    idempotency.window = 300
+                    await drive(client, path, list({id(payload): payload for payload in payloads}.values()), args.concurrency)
+                    results["answer hit"] = await measure(client, path, payloads, args.concurrency)
+                    idempotency.window = 0
+    return results
+
+
+def report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any]) -> None:
+    for endpoint, result in results.items():
+        line = f"{endpoint:>10}: {result['throughput']:9.1f} req/s  mean {result['mean_ms']:8.3f} ms  p50 {result['p50_ms']:8.3f} ms  p99 {result['p99_ms']:8.3f} ms  loop lag {result['lag_mean_ms']:6.2f} ms  max {result['lag_max_ms']:6.2f} ms"
+        previous = baseline.get("results", {}).get(endpoint)
+        if previous is not None:
+            deltas = [f"{key} {(result[key] - previous[key]) / previous[key] * 100:+.1f}%" for key in ["throughput", "p50_ms", "p99_ms"] if previous.get(key)]
+            line = f"{line}  ({', '.join(deltas)})"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the /answer and /playbook endpoints in-process.")
+    parser.add_argument("--answers", type=int, default=100, help="number of answers besides Default")
+    parser.add_argument("--filters", type=int, default=2, help="must_contain filters per answer")
+    parser.add_argument("--rules", type=float, default=0.5, help="fraction of filters written as field rules instead of substrings")
+    parser.add_argument("--machines", type=int, default=500, help="distinct synthetic machines to draw requests from")
+    parser.add_argument("--disks", type=int, default=8, help="disks per machine")
+    parser.add_argument("--nics", type=int, default=4, help="network interfaces per machine")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--endpoints", nargs="+", choices=["answer", "playbook"], default=["answer", "playbook"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="NAME", help="save the results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results against baseline NAME")
+    args = parser.parse_args()
+
+    baseline: Dict[str, Any] = {}
+    if args.compare is not None:
+        with open(os.path.join(baselines_path, f"{args.compare}.json"), "r") as f:
+            baseline = json.load(f)
+    os.environ["PATH"] = os.path.join(benchmarks_path, "bin") + os.pathsep + os.environ.get("PATH", "")
+    with tempfile.TemporaryDirectory(prefix="autopve-bench-") as workdir:
+        os.chdir(workdir)
+        results = asyncio.run(run(args))
+    report(results, baseline)
+    if args.save is not None:
+        os.makedirs(baselines_path, exist_ok=True)
+        config = {key: value for key, value in vars(args).items() if key not in ["save", "compare"]}
+        with open(os.path.join(baselines_path, f"{args.save}.json"), "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
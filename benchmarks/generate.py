@@ -0,0 +1,62 @@
+from typing import Any, Dict, List
+import random
+import string
+
+
+def serial(rnd: random.Random, length: int = 10) -> str:
+    return "".join(rnd.choice(string.ascii_uppercase + string.digits) for _ in range(length))
+
+
+def mac(rnd: random.Random) -> str:
+    return ":".join(f"{rnd.randrange(256):02x}" for _ in range(6))
+
+
+def system_info(rnd: random.Random, index: int, disks: int = 8, nics: int = 4) -> Dict[str, Any]:
+    vendor = rnd.choice(["Dell Inc.", "Supermicro", "HPE", "Lenovo"])
+    return {
+        "product": {"fullname": "Proxmox VE", "product": "pve", "enable_btrfs": True},
+        "iso": {"release": "8.4", "isorelease": "1"},
+        "dmi": {
+            "system": {"name": f"node{index:05d}", "serial": serial(rnd), "uuid": f"{rnd.getrandbits(128):032x}", "sku": serial(rnd, 6), "manufacturer": vendor},
+            "baseboard": {"serial": serial(rnd, 14), "product": serial(rnd, 8), "manufacturer": vendor, "asset-tag": f"rack{index // 40:03d}-u{index % 40:02d}"},
+            "chassis": {"serial": serial(rnd, 12), "sku": serial(rnd, 6), "asset-tag": f"rack{index // 40:03d}"},
+        },
+        "network_interfaces": [{"link": f"eno{n + 1}", "mac": mac(rnd)} for n in range(nics)],
+        "disks": [
+            {
+                "name": f"nvme{n}n1",
+                "size": rnd.choice([960197124096, 1920383410176, 3840755982336]),
+                "udev": {
+                    "DEVNAME": f"/dev/nvme{n}n1",
+                    "DEVTYPE": "disk",
+                    "ID_MODEL": rnd.choice(["SAMSUNG MZQL21T9HCJR-00A07", "INTEL SSDPE2KX020T8", "Micron_7450_MTFDKCC3T8TFR"]),
+                    "ID_SERIAL": serial(rnd, 20),
+                    "ID_SERIAL_SHORT": serial(rnd, 14),
+                    "ID_WWN": f"eui.{rnd.getrandbits(128):032x}",
+                    "ID_PATH": f"pci-0000:{rnd.randrange(256):02x}:00.0-nvme-1",
+                    "ID_PART_TABLE_TYPE": "gpt",
+                },
+            }
+            for n in range(disks)
+        ],
+    }
+
+
+def answers(rnd: random.Random, machines: List[Dict[str, Any]], count: int = 100, filters: int = 2, rules: float = 0.5) -> Dict[str, Dict[str, Any]]:
+    generated: Dict[str, Dict[str, Any]] = {}
+    for index in range(count):
+        machine = machines[index % len(machines)]
+        must_contain = []
+        for n in range(filters):
+            nic = machine["network_interfaces"][n % len(machine["network_interfaces"])]
+            if rnd.random() < rules:
+                must_contain.append(f"network_interfaces[*].mac == {nic['mac']}" if n % 2 else f"dmi.system.serial == {machine['dmi']['system']['serial']}")
+            else:
+                must_contain.append(f'"mac": "{nic["mac"]}"' if n % 2 else f'"serial": "{machine["dmi"]["system"]["serial"]}"')
+        generated[f"answer{index:05d}"] = {
+            "global": {"fqdn": f"{machine['dmi']['system']['name']}.bench.invalid"},
+            "disk-setup": {"filesystem": "zfs", "zfs.raid": "raid10", "disk-list": [disk["name"] for disk in machine["disks"][:4]]},
+            "must_contain": must_contain,
+            "must_not_contain": [f'"serial": "{serial(rnd)}"'],
+        }
+    return generated
@@ -2,10 +2,9 @@ import mylogging
 import logging
 
 logger = logging.getLogger(__name__)
-from typing import Any, Dict
 import json
+import mimetypes
 import os
-import tomlkit
 
 os.environ.setdefault("NICEGUI_STORAGE_PATH", "data")
 if not os.path.exists("data"):
@@ -25,9 +24,11 @@ if not os.path.exists("data/playbooks"):
 if not os.path.exists("data/files"):
     os.makedirs("data/files")
 
+from typing import Any, Optional
 from fastapi import Request
-from fastapi.responses import PlainTextResponse
-from nicegui import app, Client, ui  # type: ignore
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from nicegui import app, ui  # type: ignore
+from autopve import filestore, playbooks, workers
 
 
 @ui.page("/", response_timeout=30)
@@ -49,7 +50,6 @@ def page() -> None:
     ui.add_head_html('<link href="static/xterm.css" rel="stylesheet">')
     app.add_static_files("/static", "static")
     el.load_element_css()
-    app.add_static_files("/files", "data/files")
     ui.colors(
         primary=el.orange,
         secondary=el.orange,
@@ -66,110 +66,134 @@ def page() -> None:
 
 
 @app.post("/answer")
-async def post_answer(request: Request) -> PlainTextResponse:
-    import autopve.elements as el
-    from autopve import storage
+@app.post("/answer/{site}")
+async def post_answer(request: Request, site: Optional[str] = None) -> PlainTextResponse:
+    from autopve import admission, background, idempotency, notify, resolver, storage
     from autopve.tabs import history
 
-    def response(answer: str, system_info: Dict[str, Any], data: Dict[str, Any]):
-        for section in ["global", "network", "first-boot", "network.interface-name-pinning.mapping", "post-installation-webhook", "disk-setup"]:
-            if section in data and len(data[section]) == 0:
-                del data[section]
-        tomls = tomlkit.dumps(data)
-        toml_fixed = ""
-        for line in tomls.splitlines():
-            if len(line) > 0 and ((line[0] == '"' and line.split("=")[0].count(".") > 0) or (line[:2] == '["')):
-                line = line.replace('"', "", 2)
-            toml_fixed = toml_fixed + line + "\n"
-        r = history.AnswerRequest(answer=answer, response=toml_fixed, system_info=system_info)
-        history.Answer.add_history(r)
-        history.update_grids()
-        for client in Client.instances.values():
-            if not client.has_socket_connection:
-                continue
-            with client:
-                el.Notification(f"New answer request from {r.name} served by {r.answer}!", type="positive", timeout=15)
-        return PlainTextResponse(toml_fixed)
-
-    system_info = await request.json()
-    system_info_raw = json.dumps(system_info)
-    default_data = storage.answer("Default", copy=True)
-    answers = list(storage.answers.keys())
-    if "Default" in answers:
-        answers.remove("Default")
-    for answer in answers:
-        answer_data = storage.answer(answer, copy=True)
-        match = False
-        if "must_contain" in answer_data:
-            for entry in answer_data["must_contain"]:
-                if len(entry) > 0 and entry in system_info_raw:
-                    match = True
-        if "must_not_contain" in answer_data:
-            for entry in answer_data["must_not_contain"]:
-                if len(entry) > 0 and entry in system_info_raw:
-                    match = False
-        if match is True:
-            if "global" in default_data and "global" in answer_data:
-                default_data["global"].update(answer_data["global"])
-            elif "global" not in default_data and "global" in answer_data:
-                default_data["global"] = answer_data["global"]
-            if "network" in default_data and "network" in answer_data:
-                default_data["network"].update(answer_data["network"])
-            elif "network" not in default_data and "network" in answer_data:
-                default_data["network"] = answer_data["network"]
-            if "network.interface-name-pinning" in default_data and "network.interface-name-pinning" in answer_data:
-                default_data["network.interface-name-pinning"].update(answer_data["network.interface-name-pinning"])
-            elif "network.interface-name-pinning" not in default_data and "network.interface-name-pinning" in answer_data:
-                default_data["network.interface-name-pinning"] = answer_data["network.interface-name-pinning"]
-            if "network.interface-name-pinning.mapping" in default_data and "network.interface-name-pinning.mapping" in answer_data:
-                default_data["network.interface-name-pinning.mapping"].update(answer_data["network.interface-name-pinning.mapping"])
-            elif "network.interface-name-pinning.mapping" not in default_data and "network.interface-name-pinning.mapping" in answer_data:
-                default_data["network.interface-name-pinning.mapping"] = answer_data["network.interface-name-pinning.mapping"]
-            if "first-boot" in default_data and "first-boot" in answer_data:
-                default_data["first-boot"].update(answer_data["first-boot"])
-            elif "first-boot" not in default_data and "first-boot" in answer_data:
-                default_data["first-boot"] = answer_data["first-boot"]
-            if "post-installation-webhook" in default_data and "post-installation-webhook" in answer_data:
-                default_data["post-installation-webhook"].update(answer_data["post-installation-webhook"])
-            elif "post-installation-webhook" not in default_data and "post-installation-webhook" in answer_data:
-                default_data["post-installation-webhook"] = answer_data["post-installation-webhook"]
-            if "disk-setup" in default_data and "disk-setup" in answer_data:
-                if any("filter" in k for k in answer_data["disk-setup"]) and "disk_list" in default_data["disk-setup"]:
-                    del default_data["disk-setup"]["disk_list"]
-                if "disk_list" in answer_data["disk-setup"]:
-                    for key in list(default_data["disk-setup"].keys()):
-                        if "filter" in key:
-                            del default_data["disk-setup"][key]
-                default_data["disk-setup"].update(answer_data["disk-setup"])
-            elif "disk-setup" not in default_data and "disk-setup" in answer_data:
-                default_data["disk-setup"] = answer_data["disk-setup"]
-            return response(answer, system_info, default_data)
-    return response("Default", system_info, default_data)
+    site = storage.default_site if site is None else site
+    if site not in storage.sites():
+        return PlainTextResponse(f"Unknown site '{site}'.", status_code=404)
+    document = await request.body()
+    explain = {} if resolver.explaining(request.query_params.get("explain")) else None
+    digest = idempotency.key(document, site) if explain is None else None
+    repeat = idempotency.lookup(digest) if digest is not None else None
+    if repeat is not None:
+        background.submit(lambda: history.Answer.add_hit(repeat), then=history.update_grids)
+        return PlainTextResponse(repeat.body)
+    started = await admission.answer.acquire()
+    if started is None:
+        return admission.answer.rejection()
+    try:
+        # The body and the versions recorded for it come from the same rendering.
+        system_info, resolved, (toml, body) = await workers.answer.run(resolver.serve, document, site, explain)
+    finally:
+        admission.answer.release(started)
+    r = history.AnswerRequest(answer=resolved.answer, versions=resolved.versions, response=toml, site=site, system_info=system_info.data, normalized=system_info, explain=explain)
+    if digest is not None:
+        idempotency.store(digest, body, r, site)
+    served = r.answer if site == storage.default_site else f"{site}/{r.answer}"
+    background.submit(lambda: history.Answer.add_history(r), then=history.update_grids)
+    background.submit(lambda: notify.post("answer", served, f"New answer request from {r.name} served by {served}!"))
+    return PlainTextResponse(body)
+
+
+@app.post("/batch/answer")
+@app.post("/batch/answer/{site}")
+async def post_batch_answer(request: Request, site: Optional[str] = None) -> Response:
+    from autopve import admission, resolver, storage
+
+    site = storage.default_site if site is None else site
+    if site not in storage.sites():
+        return PlainTextResponse(f"Unknown site '{site}'.", status_code=404)
+    body = (await request.body()).decode("utf-8")
+    ndjson = "ndjson" in request.headers.get("content-type", "") or not body.lstrip().startswith("[")
+
+    def parse() -> Any:
+        if ndjson:
+            return [json.loads(line) for line in body.splitlines() if len(line.strip()) > 0]
+        return json.loads(body)
+
+    started = await admission.batch.acquire()
+    if started is None:
+        return admission.batch.rejection()
+    try:
+        try:
+            documents = await workers.batch.run(parse)
+        except ValueError as e:
+            return PlainTextResponse(f"Invalid batch: {e}", status_code=400)
+        if not isinstance(documents, list) or not all(isinstance(document, dict) for document in documents):
+            return PlainTextResponse("Invalid batch: expected a list of system information objects.", status_code=400)
+        explains = [] if resolver.explaining(request.query_params.get("explain")) else None
+        selected = await resolver.select_many(documents, explains, site)
+
+        def render() -> str:
+            resolved = {name: resolver.resolved(name, site) for name in set(name for name, _ in selected)}
+            results = [{"index": index, "answer": name, "response": resolved[name].rendered(system_info)[0]} for index, (name, system_info) in enumerate(selected)]
+            if explains is not None:
+                for result, explain in zip(results, explains):
+                    result["explain"] = explain
+            if ndjson:
+                return "".join(json.dumps(result) + "\n" for result in results)
+            return json.dumps(results, ensure_ascii=False, separators=(",", ":"))
+
+        text = await workers.batch.run(render)
+    finally:
+        admission.batch.release(started)
+    return PlainTextResponse(text, media_type="application/x-ndjson" if ndjson else "application/json")
 
 
 @app.post("/playbook/{name}")
 async def post_playbook(request: Request, name: str):
-    import autopve.elements as el
-    from autopve import storage
+    from autopve import admission, background, notify, storage, sysinfo
     from autopve.tabs import history
     from autopve.interfaces import cli
 
-    system_info = await request.json()
-    cli_instance = cli.Cli()
-    playbook_request = history.PlaybookRequest(playbook=name, cli=cli_instance, system_info=system_info)
-    if name in storage.playbooks():
-        system_info = {"system_info": system_info}
-        system_info_str = json.dumps(system_info).replace("'", '"')
+    if name not in playbooks.registry:
+        return PlainTextResponse(f"Unknown playbook '{name}'.", status_code=404)
+    started = await admission.playbook.acquire()
+    if started is None:
+        return admission.playbook.rejection()
+    try:
+        system_info = sysinfo.normalize(await request.json())
+        cli_instance = cli.Cli()
+        # Edits still waiting to be saved would otherwise not be part of this run.
+        storage.flush_playbook(name)
+        playbook_request = history.PlaybookRequest(playbook=name, cli=cli_instance, system_info=system_info.data, normalized=system_info)
+        system_info_str = f'{{"system_info": {system_info.raw}}}'.replace("'", '"')
         command = f"ansible-playbook data/playbooks/{name}/playbook.yaml -i data/playbooks/{name}/inventory.yaml --private-key data/id_rsa -e '{system_info_str}'"
-        await cli_instance.execute(command, wait=False, env={"ANSIBLE_CONFIG": f"data/playbooks/{name}/ansible.cfg"})
-        history.Playbook.add_history(playbook_request)
-        history.update_grids()
-        for client in Client.instances.values():
-            if not client.has_socket_connection:
-                continue
-            with client:
-                el.Notification(f"New playbook request '{name}' executed!", type="positive", timeout=15)
-        return PlainTextResponse("done")
+        process = await cli_instance.execute(command, wait=False, env={"ANSIBLE_CONFIG": f"data/playbooks/{name}/ansible.cfg"})
+    except BaseException:
+        admission.playbook.release(started)
+        raise
+    if isinstance(process, cli.Result):
+        # ansible-playbook could not be started, there is nothing to hold the slot for.
+        logger.warning(f"Playbook '{name}' did not start: {' '.join(process.stderr_lines)}")
+        admission.playbook.release(started)
+    else:
+        # The slot stays taken until ansible-playbook exits, not just until the request is answered.
+        admission.playbook.release_after(process.wait(), started)
+    background.submit(lambda: history.Playbook.add_history(playbook_request), then=history.update_grids)
+    background.submit(lambda: notify.post("playbook", name, f"New playbook request '{name}' executed!"))
+    return PlainTextResponse("done")
+
+
+class BlobResponse(FileResponse):
+    # Larger reads mean fewer trips to the file thread for every client pulling a big file.
+    chunk_size = 1024 * 1024
+
+
+@app.api_route("/files/{name:path}", methods=["GET", "HEAD"])
+async def get_file(request: Request, name: str) -> Response:
+    entry = await filestore.store.get(name)
+    if entry is None:
+        return Response(status_code=404)
+    # The ETag is the sha256 of the content, so a node that already has the file is told so without sending it again.
+    headers = {"etag": entry.etag, "cache-control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and (if_none_match.strip() == "*" or entry.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return BlobResponse(filestore.store.path(entry.digest), headers=headers, media_type=mimetypes.guess_type(name)[0] or "application/octet-stream")
 
 
 if __name__ in {"__main__", "__mp_main__"}:
@@ -1,5 +1,7 @@
 # from nicegui.testing.conftest import *
 from collections.abc import Generator
+from pathlib import Path
+import json
 import os
 import pytest
 from nicegui.testing import Screen
@@ -50,3 +52,32 @@ def screen(
     if screen_.is_open:
         screen_.shot(request.node.name)
     screen_.stop_server()
+
+
+@pytest.fixture
+def answer_database(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    """Write answers to a database in a temporary directory and put back the answers a test changed."""
+    from autopve import database, storage
+
+    original = os.path.abspath(storage.database_path)
+    saved = {site: json.loads(json.dumps(storage.answer_set(site))) for site in storage.sites()}
+    storage.flush()
+    database.close()
+    monkeypatch.chdir(tmp_path)
+    database.connect(storage.database_path)
+    database.load()
+    yield
+    for site in storage.sites():
+        if site not in saved:
+            storage.remove_site(site)
+    for site, answers in saved.items():
+        current = storage.answer_set(site)
+        for name in [name for name in current if name not in answers]:
+            del current[name]
+        for name, data in answers.items():
+            if current.get(name) != data:
+                current[name] = data
+    storage.flush()
+    database.close()
+    database.connect(original)
+    database.load()
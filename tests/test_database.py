@@ -0,0 +1,50 @@
+import pytest
+from autopve import database, storage
+
+pytestmark = pytest.mark.usefixtures("answer_database")
+
+
+def answer(index: int) -> dict:
+    return {"global": {"fqdn": f"node{index}.example", "keyboard": "de", "country": "at", "mailto": "mail@no.invalid"}, "disk-setup": {"disk_list": ["sda", "sdb"]}}
+
+
+def test_revisions_are_rebuilt_across_keyframes(monkeypatch):
+    monkeypatch.setattr(database, "keyframe_interval", 5)
+    for index in range(1, 13):
+        database.save("keyframes", "rack", answer(index))
+    kinds = {revision.version: revision.kind for revision in database.revisions("keyframes", "rack")}
+    assert [version for version, kind in sorted(kinds.items()) if kind == "full"] == [1, 6, 11]
+    assert all(kind == "delta" for version, kind in kinds.items() if version not in [1, 6, 11])
+    for index in range(1, 13):
+        assert database.revision("keyframes", "rack", index) == answer(index)
+    assert database.revision("keyframes", "rack", 13) is None
+    assert database.revision("keyframes", "rack", 0) is None
+    assert database.revision("keyframes", "missing", 1) is None
+
+
+def test_rollback_records_a_new_version():
+    storage.add_site("lab")
+    storage.answer_set("lab")["rack"] = answer(1)
+    storage.answer_set("lab")["rack"]["global"]["fqdn"] = "changed.example"
+    assert storage.version("rack", "lab") == 2
+    assert storage.rollback("rack", 1, "lab") == 3
+    assert storage.answer_set("lab")["rack"] == answer(1)
+    assert [revision.version for revision in storage.revisions("rack", "lab")] == [3, 2, 1]
+    assert storage.revision("rack", 3, "lab") == answer(1)
+    with pytest.raises(ValueError):
+        storage.rollback("rack", 9, "lab")
+
+
+def test_deleting_an_answer_leaves_a_tombstone():
+    storage.add_site("lab")
+    storage.answer_set("lab")["rack"] = answer(1)
+    del storage.answer_set("lab")["rack"]
+    revisions = storage.revisions("rack", "lab")
+    assert [(revision.version, revision.kind) for revision in revisions] == [(2, "deleted"), (1, "full")]
+    assert storage.revision("rack", 2, "lab") is None
+    assert database.row("lab", "rack") is None
+    storage.answer_set("lab")["rack"] = answer(2)
+    assert storage.version("rack", "lab") == 3
+    assert storage.revisions("rack", "lab")[0].kind == "full"
+    assert storage.rollback("rack", 1, "lab") == 4
+    assert storage.answer_set("lab")["rack"] == answer(1)
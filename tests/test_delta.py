@@ -0,0 +1,47 @@
+import copy
+import json
+import random
+import pytest
+from autopve import delta
+
+
+def value(generator: random.Random, depth: int = 0):
+    choice = generator.random()
+    if depth < 3 and choice < 0.4:
+        return {generator.choice("abcdef"): value(generator, depth + 1) for _ in range(generator.randint(0, 4))}
+    if choice < 0.5:
+        return [generator.randint(0, 3) for _ in range(generator.randint(0, 3))]
+    if choice < 0.7:
+        return generator.choice(["x", "y", ""])
+    if choice < 0.8:
+        return generator.choice([None, True, False])
+    return generator.choice([0, 1, 1.0, 2])
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_apply_reverses_diff(seed):
+    generator = random.Random(seed)
+    for _ in range(20):
+        old, new = value(generator), value(generator)
+        changes = delta.diff(old, new)
+        # Changes are stored as JSON, so they are round-tripped through it like the database does.
+        result = delta.apply(copy.deepcopy(old), json.loads(json.dumps(changes)))
+        assert result == new
+        assert type(result) is type(new)
+
+
+def test_diff_records_only_what_changed():
+    old = {"global": {"keyboard": "de", "country": "at"}, "network": {"source": "from-dhcp"}}
+    new = {"global": {"keyboard": "en-us", "country": "at"}, "disk-setup": {"filesystem": "zfs"}}
+    assert delta.diff(old, new) == [[["network"]], [["global", "keyboard"], "en-us"], [["disk-setup"], {"filesystem": "zfs"}]]
+    assert delta.diff(new, new) == []
+
+
+def test_diff_keeps_numeric_types():
+    assert delta.diff({"a": 1}, {"a": 1.0}) == [[["a"], 1.0]]
+    assert delta.diff({"a": 1}, {"a": True}) == [[["a"], True]]
+
+
+def test_lines():
+    assert delta.lines({"a": 1}, {"a": 1}) == ""
+    assert '+  "a": 2' in delta.lines({"a": 1}, {"a": 2}).splitlines()
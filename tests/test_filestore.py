@@ -0,0 +1,33 @@
+import asyncio
+from autopve import filestore
+
+
+def test_concurrent_requests_adopt_a_placed_file_once(tmp_path, monkeypatch):
+    store = filestore.Store(str(tmp_path))
+    store.load()
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "pve.iso").write_bytes(b"iso" * 100000)
+    hashed = []
+    hash_placed = store._hash_placed
+    monkeypatch.setattr(store, "_hash_placed", lambda name, path: hashed.append(name) or hash_placed(name, path))
+
+    async def fetch():
+        return await asyncio.gather(*(store.get("images/pve.iso") for _ in range(20)))
+
+    entries = asyncio.run(fetch())
+    assert hashed == ["images/pve.iso"]
+    assert all(entry is not None and entry.digest == entries[0].digest for entry in entries)
+    assert not (tmp_path / "images" / "pve.iso").exists()
+    assert (tmp_path / ".objects" / entries[0].digest[:2] / entries[0].digest).exists()
+
+
+def test_placing_a_file_over_a_stored_one_replaces_it(tmp_path):
+    store = filestore.Store(str(tmp_path))
+    store.load()
+    (tmp_path / "answer.txt").write_bytes(b"old")
+    old = asyncio.run(store.get("answer.txt"))
+    (tmp_path / "answer.txt").write_bytes(b"new")
+    new = asyncio.run(store.get("answer.txt"))
+    assert old.digest != new.digest
+    assert not (tmp_path / ".objects" / old.digest[:2] / old.digest).exists()
+    assert asyncio.run(store.get("answer.txt")) == new
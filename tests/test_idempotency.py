@@ -0,0 +1,67 @@
+from typing import Dict
+from dataclasses import dataclass, field
+import pytest
+from autopve import idempotency
+
+
+@dataclass
+class Request:
+    answer: str = "rack"
+    versions: Dict[str, int] = field(default_factory=lambda: {"Default": 1, "rack": 2})
+    name: str = "node1"
+    timestamp: float = 1000.0
+    system_info: Dict[str, str] = field(default_factory=lambda: {"large": "x" * 1000})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(idempotency, "window", 300.0)
+    monkeypatch.setattr(idempotency, "_entries", type(idempotency._entries)())
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_repeat_is_served_with_what_the_history_needs(clock):
+    digest = idempotency.key(b'{"dmi": {}}', "default")
+    assert idempotency.lookup(digest) is None
+    idempotency.store(digest, b"toml", Request(), "default")
+    repeat = idempotency.lookup(digest)
+    assert repeat is not None
+    assert (repeat.body, repeat.site, repeat.answer, repeat.versions, repeat.name, repeat.timestamp) == (b"toml", "default", "rack", {"Default": 1, "rack": 2}, "node1", 1000.0)
+    assert not hasattr(repeat, "request") and not hasattr(repeat, "system_info")
+    assert idempotency.key(b'{"dmi": {}}', "other") != digest
+
+
+def test_entries_expire_after_the_window(clock):
+    idempotency.store("first", b"1", Request(), "default")
+    clock[0] = 200.0
+    idempotency.store("second", b"2", Request(), "default")
+    clock[0] = 300.0
+    assert idempotency.lookup("first") is None
+    assert idempotency.lookup("second") is not None
+    clock[0] = 500.0
+    assert idempotency.lookup("second") is None
+    assert len(idempotency._entries) == 0
+
+
+def test_oldest_entries_are_dropped_beyond_the_limit(clock, monkeypatch):
+    monkeypatch.setattr(idempotency, "max_entries", 3)
+    for index in range(5):
+        idempotency.store(str(index), b"", Request(), "default")
+    assert [digest for digest in idempotency._entries] == ["2", "3", "4"]
+
+
+def test_edits_clear_their_site_and_mappings_clear_all(clock):
+    idempotency.store("a", b"", Request(), "default")
+    idempotency.store("b", b"", Request(), "lab")
+    idempotency.clear("lab", "rack")
+    assert idempotency.lookup("a") is not None and idempotency.lookup("b") is None
+    idempotency.clear()
+    assert idempotency.lookup("a") is None
+
+
+def test_disabled_window_keeps_nothing(clock, monkeypatch):
+    monkeypatch.setattr(idempotency, "window", 0.0)
+    idempotency.store("a", b"", Request(), "default")
+    assert idempotency.lookup("a") is None and len(idempotency._entries) == 0
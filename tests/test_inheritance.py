@@ -0,0 +1,65 @@
+import pytest
+from autopve import inheritance, resolver, storage
+
+pytestmark = pytest.mark.usefixtures("answer_database")
+
+
+@pytest.fixture
+def lab():
+    storage.add_site("lab")
+    answers = storage.answer_set("lab")
+    answers["base"] = {"global": {"fqdn": "base.example"}}
+    answers["rack"] = {"extends": "base", "global": {"mailto": "rack@no.invalid"}}
+    answers["node"] = {"extends": "rack"}
+    answers["other"] = {"global": {"fqdn": "other.example"}}
+    return answers
+
+
+def test_chain_and_descendants(lab):
+    assert inheritance.chain("node", "lab") == ["Default", "base", "rack", "node"]
+    assert inheritance.chain("other", "lab") == ["Default", "other"]
+    assert inheritance.descendants("base", "lab") == {"rack", "node"}
+    assert inheritance.parents("rack", "lab") == ["Default", "base", "other"]
+
+
+def test_unknown_or_own_parent_falls_back_to_default(lab):
+    lab["other"]["extends"] = "missing"
+    assert inheritance.chain("other", "lab") == ["Default", "other"]
+    lab["other"]["extends"] = "other"
+    assert inheritance.chain("other", "lab") == ["Default", "other"]
+
+
+def test_editing_a_parent_drops_its_descendants(lab):
+    node, other = resolver.resolved("node", "lab"), resolver.resolved("other", "lab")
+    assert 'fqdn = "base.example"' in node.toml
+    lab["base"]["global"]["fqdn"] = "changed.example"
+    assert resolver.resolved("other", "lab") is other
+    assert 'fqdn = "changed.example"' in resolver.resolved("node", "lab").toml
+    assert resolver.resolved("node", "lab").versions == {"Default": 1, "base": 2, "rack": 1, "node": 1}
+
+
+def test_changing_the_parent_moves_the_subtree(lab):
+    resolver.resolved("node", "lab")
+    lab["rack"]["extends"] = "other"
+    assert inheritance.descendants("base", "lab") == set()
+    assert inheritance.descendants("other", "lab") == {"rack", "node"}
+    assert 'fqdn = "other.example"' in resolver.resolved("node", "lab").toml
+
+
+def test_cycles_fall_back_to_default(lab):
+    lab["base"]["extends"] = "node"
+    assert inheritance.chain("node", "lab") == ["Default", "base", "rack", "node"]
+    assert inheritance.chain("base", "lab") == ["Default", "rack", "node", "base"]
+    assert inheritance.descendants("base", "lab") == {"rack", "node", "base"}
+    assert "global" in resolver.resolved("rack", "lab").data
+
+
+def test_renaming_and_removing_a_parent_updates_its_children(lab):
+    inheritance.rename_answer("rack", "row", "lab")
+    lab["row"] = lab.pop("rack")
+    assert lab["node"]["extends"] == "row"
+    assert inheritance.chain("node", "lab") == ["Default", "base", "row", "node"]
+    inheritance.remove_answer("base", "lab")
+    del lab["base"]
+    assert "extends" not in lab["row"]
+    assert inheritance.chain("node", "lab") == ["Default", "row", "node"]
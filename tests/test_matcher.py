@@ -0,0 +1,76 @@
+import random
+import pytest
+from autopve import matcher, sysinfo
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_automaton_finds_what_substring_search_finds(seed):
+    generator = random.Random(seed)
+    words = ["".join(generator.choice("abc") for _ in range(generator.randint(1, 6))) for _ in range(50)]
+    automaton = matcher.Automaton(words)
+    for _ in range(20):
+        text = "".join(generator.choice("abcd") for _ in range(generator.randint(0, 200)))
+        assert automaton.search(text) == {index for index, word in enumerate(words) if word in text}
+
+
+def test_parse_rule():
+    rule = matcher.parse_rule('dmi.system.serial == "ABC 123"')
+    assert rule is not None
+    assert rule.segments == ("dmi", "system", "serial")
+    assert rule.value == "ABC 123"
+    assert matcher.parse_rule("network_interfaces[*].mac == aa:bb").segments == ("network_interfaces", "*", "mac")
+    assert matcher.parse_rule("just some text") is None
+
+
+def answers(generator: random.Random) -> dict:
+    values = ["nvme", "sda", "dell", "hp", "aa:bb", "ABC1", "zzz", "qqq", "www", "vvv"]
+    entries = [*values, *[f"disks[*].name == {value}" for value in values], *[f"dmi.system.serial == {value}" for value in values]]
+    result = {"Default": {}}
+    for index in range(generator.randint(3, 40)):
+        data = {"priority": generator.randint(-2, 2)}
+        if generator.random() < 0.8:
+            data["must_contain"] = generator.sample(entries, generator.randint(1, 3))
+        if generator.random() < 0.3:
+            data["must_not_contain"] = generator.sample(entries, 1)
+        if generator.random() < 0.2:
+            data["must_match"] = [generator.choice(["^nvme", "disks[*].name ~ ^sd", "dell|hp"])]
+        if generator.random() < 0.2:
+            data["rule"] = generator.choice(['dmi.system.serial == "ABC1"', "count(disks[*]) >= 2", '"hp" and not dmi.system.vendor == lenovo'])
+        result[f"answer{index}"] = data
+    return result
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_indexed_match_agrees_with_walking_every_candidate(seed):
+    generator = random.Random(seed)
+    compiled = matcher.Matcher(answers(generator))
+    for _ in range(30):
+        names = ["nvme0n1", "sda", "sdb", "xyz"]
+        system_info = sysinfo.normalize(
+            {
+                "disks": [{"name": name} for name in generator.sample(names, generator.randint(0, 3))],
+                "dmi": {"system": {"serial": generator.choice(["ABC1", "dell", "none"]), "vendor": generator.choice(["hp", "lenovo"])}},
+            }
+        )
+        walked = next((candidate.answer for candidate in compiled.candidates if matcher.Evaluation(compiled, system_info).accepts(candidate)), None)
+        assert compiled.match(system_info) == walked
+        assert compiled.match(system_info, explain={}) == walked
+
+
+@pytest.mark.parametrize("key", ["must_not_match", "must_match"])
+def test_answers_with_disabled_regex_filters_are_not_matched(monkeypatch, key):
+    entry = f"dmi.system.serial ~ ^EXCLUDED\\d+ {key}"
+    monkeypatch.setattr(matcher.patterns, "budget", -1.0)
+    monkeypatch.delitem(matcher.patterns._compiled, entry, raising=False)
+    data = {"must_contain": ["dell"], key: [entry]} if key == "must_not_match" else {key: [entry]}
+    compiled = matcher.Matcher({"Default": {}, "rack": data})
+    system_info = sysinfo.normalize({"dmi": {"system": {"vendor": "dell", "serial": f"EXCLUDED1 {key}"}}})
+    expected = None if key == "must_not_match" else "rack"
+    for _ in range(matcher.patterns.strikes):
+        assert compiled.match(system_info) == expected
+    assert matcher.patterns.compiled(entry).disabled
+    assert compiled.match(system_info) is None
+    explain = {}
+    assert compiled.match(system_info, explain) is None
+    assert explain["candidates"][0]["disabled"] == [entry]
+    del matcher.patterns._compiled[entry]
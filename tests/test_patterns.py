@@ -0,0 +1,77 @@
+import time
+import pytest
+from autopve import patterns
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        "Intel",
+        "^nvme\\d+n1$",
+        "nvme\\d+n1",
+        '"serial": "ABC1[0-4]\\d{3}"',
+        "disks[*].name ~ ^nvme",
+        "\\d{1,3}(\\.\\d{1,3}){3}",
+        "[0-9a-f]{2}(:[0-9a-f]{2}){5}",
+        "(foo|bar)+",
+        "^(\\w+\\s)+end",
+        "(?i)^samsung",
+        "^intel.*ssd$",
+        "\\d+",
+        "ab*c",
+    ],
+)
+def test_accepts(entry):
+    assert patterns.check(entry) is None
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        "(a{1,1000}){1,1000}$",
+        "a*a*a*a*a*b",
+        ".*\\d+.*\\d+.*NOMATCH",
+        "(a+)+b",
+        "(a|aa)+",
+        "(a|a){1,100}",
+        "(a?|b?)+",
+        "(\\w+\\s?)+$",
+        "(a{1,30}){1,30}$",
+        ".*a.*b",
+        ".*ab.*c",
+        "intel.*ssd",
+        "\\d+x",
+        "(?m)^\\d+x",
+        "a{0,1000}a{0,1000}b",
+        "a{1001}",
+        "(a)\\1",
+        "(?=a)b",
+        "a" * (patterns.max_length + 1),
+        "(",
+    ],
+)
+def test_rejects(entry):
+    assert patterns.check(entry) is not None
+
+
+@pytest.mark.parametrize(
+    "entry, text",
+    [
+        ("(a{1,1000}){1,1000}$", "a" * 27),
+        ("a*a*a*a*a*b", "a" * 300),
+        (".*\\d+.*\\d+.*NOMATCH", "1a" * 2048),
+    ],
+)
+def test_rejected_patterns_do_not_run(entry, text):
+    compiled = patterns.compiled(entry)
+    assert compiled.pattern is None
+    assert compiled.search(patterns.sysinfo.normalize({"text": text})) is False
+
+
+@pytest.mark.parametrize("entry", ["nvme\\d+n1", "\\d{1,3}(\\.\\d{1,3}){3}", "(foo|bar)+", "\\d+", "ab*c"])
+@pytest.mark.parametrize("text", ["a" * 65536, "1" * 65536, "1." * 32768, "foo" * 21845, "ab" * 32768])
+def test_accepted_patterns_stay_linear(entry, text):
+    compiled = patterns.compiled(entry)
+    start = time.perf_counter()
+    compiled.pattern.search(text + "!", 0, patterns.max_input)
+    assert time.perf_counter() - start < 0.25
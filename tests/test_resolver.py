@@ -0,0 +1,39 @@
+import pytest
+from autopve import resolver, storage
+
+
+def test_merge_overrides_default_sections():
+    default = {"global": {"keyboard": "de", "country": "at"}, "disk-setup": {"filesystem": "zfs", "disk_list": ["sda"]}}
+    answer = {"global": {"keyboard": "en-us"}, "disk-setup": {"filter.ID_SERIAL": "*ABC*"}, "network": {"source": "from-dhcp"}}
+    data = resolver.merge(default, answer)
+    assert data["global"] == {"keyboard": "en-us", "country": "at"}
+    assert data["network"] == {"source": "from-dhcp"}
+    assert data["disk-setup"] == {"filesystem": "zfs", "filter.ID_SERIAL": "*ABC*"}
+    assert default["global"]["keyboard"] == "de"
+
+
+def test_merge_disk_list_replaces_filters():
+    data = resolver.merge({"disk-setup": {"filter.ID_SERIAL": "*ABC*"}}, {"disk-setup": {"disk_list": ["sdb"]}})
+    assert data["disk-setup"] == {"disk_list": ["sdb"]}
+
+
+def test_render_drops_empty_sections_and_unquotes_dotted_keys():
+    toml = resolver.render({"global": {"keyboard": "de"}, "network": {}, "disk-setup": {"zfs.raid": "raid1"}})
+    assert "[network]" not in toml
+    assert "zfs.raid = " in toml
+    assert toml.startswith('[global]\nkeyboard = "de"\n')
+
+
+@pytest.mark.usefixtures("answer_database")
+def test_edits_only_drop_the_answers_they_touch():
+    storage.answers["resolver-a"] = {"global": {"fqdn": "a.example"}}
+    storage.answers["resolver-b"] = {"global": {"fqdn": "b.example"}}
+    first_a, first_b = resolver.resolved("resolver-a"), resolver.resolved("resolver-b")
+    assert 'fqdn = "a.example"' in first_a.toml
+    assert resolver.resolved("resolver-a") is first_a
+    storage.answers["resolver-a"]["global"]["fqdn"] = "c.example"
+    assert 'fqdn = "c.example"' in resolver.resolved("resolver-a").toml
+    assert resolver.resolved("resolver-b") is first_b
+    storage.answers["Default"]["global"]["keyboard"] = "en-us"
+    assert resolver.resolved("resolver-b") is not first_b
+    assert 'keyboard = "en-us"' in resolver.resolved("resolver-b").toml
@@ -0,0 +1,77 @@
+import pytest
+from autopve import rules, sysinfo
+
+system_info = sysinfo.normalize(
+    {
+        "dmi": {"system": {"serial": "ABC 123", "vendor": "Dell Inc."}},
+        "disks": [{"name": "nvme0n1", "size": 512}, {"name": "sda", "size": 4000}, {"name": "sdb", "size": 4000}],
+        "cpu": {"cores": 16},
+    }
+)
+
+
+def evaluate(expression: str) -> bool:
+    program = rules.Program()
+    index = program.compile(expression)
+    return program.evaluate(index, system_info.raw, system_info.values, {})
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ('dmi.system.serial == "ABC 123"', True),
+        ("dmi.system.serial == ABC", False),
+        ("dmi.system.serial != ABC", True),
+        ("dmi.system.vendor contains Dell", True),
+        ("disks[*].name == sda", True),
+        ("disks[0].name == nvme0n1", True),
+        ("disks[*].size > 1000", True),
+        ("disks[*].size > 5000", False),
+        ("cpu.cores >= 16 and cpu.cores <= 16", True),
+        ("cpu.cores < 16", False),
+        ("count(disks[*]) == 3", True),
+        ("count(disks[*].size == 4000) >= 2", True),
+        ("count(disks[*].name contains nvme) > 1", False),
+        ('"nvme0n1"', True),
+        ('"missing"', False),
+        ("not disks[*].name == sdc", True),
+        ("disks[*].name == sdc or cpu.cores == 16", True),
+        ("(disks[*].name == sdc or cpu.cores == 16) and not dmi.system.vendor contains Dell", False),
+        ("DISKS[*].name == sda", False),
+        ("cpu.cores == sixteen", False),
+    ],
+)
+def test_evaluate(expression, expected):
+    assert evaluate(expression) is expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "",
+        "cpu.cores",
+        "cpu.cores ==",
+        "cpu.cores > many",
+        "count(disks[*]) == many",
+        "count(disks[*]) contains 2",
+        "(cpu.cores == 16",
+        "cpu.cores == 16)",
+        "cpu.cores == 16 and",
+        "disks[x.name == sda",
+    ],
+)
+def test_check_rejects(expression):
+    assert rules.check(expression) is not None
+
+
+def test_check_accepts():
+    assert rules.check('dmi.system.serial == "ABC 123" and count(disks[*]) >= 2') is None
+
+
+def test_identical_subexpressions_share_nodes():
+    program = rules.Program()
+    first = program.compile("cpu.cores == 16 and disks[*].name == sda")
+    second = program.compile("disks[*].name == sda and cpu.cores == 16")
+    assert first != second
+    assert len(program.nodes) == 4
+    assert program.compile("cpu.cores == 16 and disks[*].name == sda") == first
@@ -0,0 +1,41 @@
+import pytest
+from autopve import snapshots
+
+
+def test_freeze_and_thaw_round_trip():
+    data = {"global": {"keyboard": "de"}, "disk-setup": {"disk-list": ["sda", "sdb"]}, "must_contain": [{"a": 1}]}
+    frozen = snapshots.freeze(data)
+    assert frozen["disk-setup"]["disk-list"] == ("sda", "sdb")
+    assert snapshots.thaw(frozen) == data
+    with pytest.raises(TypeError):
+        frozen["global"]["keyboard"] = "en-us"
+
+
+def test_thawed_copies_are_independent():
+    frozen = snapshots.freeze({"global": {"keyboard": "de"}})
+    copy = snapshots.thaw(frozen)
+    copy["global"]["keyboard"] = "en-us"
+    assert frozen["global"]["keyboard"] == "de"
+
+
+def test_unchanged_answers_are_shared():
+    answers = {"Default": {"global": {"keyboard": "de"}}, "a": {"priority": 1}, "b": {"priority": 2}}
+    first = snapshots.build("default", 1, answers)
+    answers["a"]["priority"] = 3
+    second = snapshots.build("default", 2, answers, first, "a")
+    assert second.get("a")["priority"] == 3
+    assert first.get("a")["priority"] == 1
+    assert second.get("b") is first.get("b")
+    assert second.get("Default") is first.get("Default")
+
+
+def test_replaced_and_removed_answers():
+    answers = {"Default": {}, "a": {"priority": 1}}
+    first = snapshots.build("default", 1, answers)
+    answers["a"] = {"priority": 2}
+    answers["c"] = {}
+    del answers["Default"]
+    second = snapshots.build("default", 2, answers, first, None)
+    assert second.get("a")["priority"] == 2
+    assert second.names == frozenset({"a", "c"})
+    assert len(second.get("Default")) == 0
@@ -0,0 +1,39 @@
+import pytest
+from autopve import resolver, sysinfo, template
+
+system_info = sysinfo.normalize({"dmi": {"system": {"serial": " abc123 "}}, "network_interfaces": [{"link": "eno1", "mac": "aa:bb:cc:dd:ee:ff"}]})
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("pve-{{ dmi.system.serial | strip | upper }}", "pve-ABC123"),
+        ('{{network_interfaces[0].link}}/{{ network_interfaces[*].mac | replace(":", "") }}', "eno1/aabbccddeeff"),
+        ("{{ dmi.system.serial | strip | slice(0, 3) }}", "abc"),
+        ('{{ dmi.board.name | default("unknown") }}', "unknown"),
+        ("{{ dmi.board.name }}", ""),
+    ],
+)
+def test_render(text, expected):
+    assert template.parse(text).render(system_info) == expected
+
+
+def test_plain_text_is_not_a_template():
+    assert template.parse("pve.example") is None
+    assert template.parse("{{ but not closed") is None
+
+
+@pytest.mark.parametrize("text", ["{{ dmi..serial }}", "{{ dmi.system.serial | shout }}", '{{ dmi.system.serial | slice("a") }}', "{{ dmi.system.serial | replace }}"])
+def test_invalid_templates_are_served_as_written(text):
+    with pytest.raises(ValueError):
+        template.parse(text)
+    assert template.parsed(text) is None
+
+
+def test_rendered_values_are_escaped_in_toml():
+    templates = []
+    data = resolver.slots({"global": {"fqdn": "{{ dmi.system.serial }}", "keyboard": "de"}}, templates)
+    toml = resolver.render(data)
+    chunks = resolver.slot_pattern.split(toml)
+    quoted = sysinfo.normalize({"dmi": {"system": {"serial": 'a"b\\c'}}})
+    assert 'fqdn = "a\\"b\\\\c"' in resolver.fill(chunks, [compiled.render(quoted) for compiled in templates])